@@ -0,0 +1,134 @@
+# Lazy asset loading. Images are loaded, scaled and converted to the display
+# format the first time they are asked for. Sounds are decoded once; their raw
+# PCM goes into an on-disk bundle keyed by the source file's hash, with one
+# bundle per mixer format, so later launches read samples instead of decoding
+# MP3s. Loads are thread-safe, so a Preloader can run them off the main thread.
+
+import hashlib
+import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+ENTRY = struct.Struct("<20sI")  # source sha1, PCM length in bytes
+
+class PCMBundle:
+    # Append-only file of (header, PCM) entries. A torn entry at the end,
+    # from a crash mid-write, is ignored and overwritten by the next put()
+    def __init__(self, path):
+        self.path = path
+        self.index = {}  # sha1 -> (offset, length)
+        self.end = 0     # end of the last complete entry
+        if os.path.exists(path):
+            self.scan()
+
+    def scan(self):
+        size = os.path.getsize(self.path)
+        with open(self.path, "rb") as f:
+            while self.end + ENTRY.size <= size:
+                f.seek(self.end)
+                key, length = ENTRY.unpack(f.read(ENTRY.size))
+                start = self.end + ENTRY.size
+                if start + length > size:
+                    break
+                self.index[key] = (start, length)
+                self.end = start + length
+
+    def get(self, key):
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        with open(self.path, "rb") as f:
+            f.seek(entry[0])
+            return f.read(entry[1])
+
+    def put(self, key, pcm):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.truncate(self.end)
+            f.write(ENTRY.pack(key, len(pcm)))
+            f.write(pcm)
+        self.index[key] = (self.end + ENTRY.size, len(pcm))
+        self.end += ENTRY.size + len(pcm)
+
+class Assets:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.images = {}
+        self.sounds = {}
+        self.bundle = None
+        self.lock = threading.Lock()  # guards the caches, counters and bundle file
+        self.decoded = 0  # sounds decoded from their source file
+        self.cached = 0   # sounds read back from the PCM bundle
+
+    def image(self, path, size=None, alpha=False):
+        key = (path, size, alpha)
+        surf = self.images.get(key)
+        if surf is None:
+            surf = pygame.image.load(path)
+            if size:
+                surf = pygame.transform.scale(surf, size)
+            # Blits from a surface in the display's pixel format skip the
+            # per-pixel conversion; that needs a display mode to be set
+            if pygame.display.get_surface() is not None:
+                surf = surf.convert_alpha() if alpha else surf.convert()
+            with self.lock:
+                surf = self.images.setdefault(key, surf)
+        return surf
+
+    def pcm_bundle(self):
+        frequency, size, channels = pygame.mixer.get_init()
+        path = os.path.join(self.cache_dir, f"audio-{frequency}-{size}-{channels}.bundle")
+        if self.bundle is None or self.bundle.path != path:
+            self.bundle = PCMBundle(path)
+        return self.bundle
+
+    def sound(self, path):
+        sound = self.sounds.get(path)
+        if sound is None:
+            with open(path, "rb") as f:
+                key = hashlib.sha1(f.read()).digest()
+            with self.lock:
+                pcm = self.pcm_bundle().get(key)
+            cached = pcm is not None
+            # Decoding runs unlocked so several sounds can decode at once
+            sound = pygame.mixer.Sound(buffer=pcm) if cached else pygame.mixer.Sound(path)
+            with self.lock:
+                if cached:
+                    self.cached += 1
+                else:
+                    self.decoded += 1
+                    bundle = self.pcm_bundle()
+                    try:
+                        if key not in bundle.index:
+                            bundle.put(key, sound.get_raw())
+                    except OSError:
+                        pass  # a read-only install just decodes every launch
+                sound = self.sounds.setdefault(path, sound)
+        return sound
+
+class Preloader:
+    # Runs asset loads on a small thread pool so the main loop can keep
+    # drawing; callers poll the returned futures instead of waiting on them
+    def __init__(self, workers=2):
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="preload")
+        self.futures = []
+
+    def submit(self, load, *args):
+        future = self.pool.submit(load, *args)
+        self.futures.append(future)
+        return future
+
+    def progress(self):
+        if not self.futures:
+            return 1.0
+        return sum(f.done() for f in self.futures) / len(self.futures)
+
+    @property
+    def done(self):
+        return all(f.done() for f in self.futures)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
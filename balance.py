@@ -0,0 +1,244 @@
+# Headless batch runner for difficulty balancing.
+#
+#   python balance.py --games 10000 --policy scripted --json report.json --csv games.csv
+#   python balance.py --games 2000 --set boss_hp=350 --set level3.powerup_chance=0.2
+#
+# Each game is seeded with --seed + its index, so a report can be reproduced
+# exactly. Games are spread over a process pool in chunks, so throughput grows
+# with the number of cores.
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # one banner per worker otherwise
+import brickshooting as game
+
+MAX_TICKS = 60 * 60 * 10  # ten minutes of game time at 60 ticks/s
+PHASES = (1, 2, 3)
+LEVELS = tuple(range(1, game.FINAL_LEVEL + 1))
+
+def random_policy(seed):
+    # Holds a random direction for a random number of ticks, fires most of the time
+    rng = random.Random(seed ^ 0x5EED)
+    move = [0, 0]
+
+    def act(state):
+        if move[1] <= 0:
+            move[0] = rng.choice((-1, 0, 1))
+            move[1] = rng.randint(5, 40)
+        move[1] -= 1
+        return game.Inputs(left=move[0] < 0, right=move[0] > 0, fire=rng.random() < 0.9)
+    return act
+
+def scripted_policy(seed):
+    # Walks under the lowest brick (or the boss) and keeps firing, sidestepping
+    # fireballs that are about to land on the character
+    def act(state):
+        char = state.character.rect
+        target = None
+        if state.boss:
+            target = state.boss.rect.centerx
+        else:
+            lowest = None
+            for brick in state.bricks:
+                rect = brick.rect
+                key = (rect.bottom, -abs(rect.centerx - char.centerx))
+                if lowest is None or key > lowest[0]:
+                    lowest = (key, rect.centerx)
+            if lowest:
+                target = lowest[1]
+        threat = None
+        fireballs = state.boss_projectiles
+        n = fireballs.count
+        bottom = fireballs.y[:n] + fireballs.height
+        centerx = fireballs.x[:n] + fireballs.width // 2
+        near = np.flatnonzero((char.top - bottom > 0) & (char.top - bottom < 150) &
+                              (np.abs(centerx - char.centerx) < 30))
+        if len(near):
+            threat = int(centerx[near[0]])
+        if threat is not None:
+            # Step away from the fireball, towards the side with more room
+            if threat >= char.centerx:
+                direction = -1 if char.left > 40 else 1
+            else:
+                direction = 1 if char.right < game.WIDTH - 40 else -1
+        elif target is None or abs(target - char.centerx) < state.character.speed:
+            direction = 0
+        else:
+            direction = 1 if target > char.centerx else -1
+        return game.Inputs(left=direction < 0, right=direction > 0, fire=True)
+    return act
+
+POLICIES = {"random": random_policy, "scripted": scripted_policy}
+
+def play_game(seed, policy_name, max_ticks=MAX_TICKS):
+    state = game.GameState(seed=seed)
+    policy = POLICIES[policy_name](seed)
+    clear_ticks = {}
+    phase_ticks = {}
+    level_start = 0
+    phase = None
+    phase_start = 0
+    while state.tick < max_ticks and not state.game_over:
+        level = state.level
+        state.step(policy(state))
+        if state.level != level:
+            clear_ticks[level] = state.tick - level_start
+            level_start = state.tick
+        if state.boss and state.boss.phase != phase:
+            if phase is not None:
+                phase_ticks[phase] = state.tick - phase_start
+            phase = state.boss.phase
+            phase_start = state.tick
+    if phase is not None:
+        phase_ticks[phase] = state.tick - phase_start
+
+    if state.win:
+        outcome = "win"
+    elif state.game_over:
+        outcome = "death"
+    else:
+        outcome = "timeout"
+    row = {"seed": seed, "policy": policy_name, "outcome": outcome, "score": state.score,
+           "ticks": state.tick, "level": min(state.level, game.FINAL_LEVEL)}
+    for level in LEVELS:
+        row[f"clear_{level}"] = clear_ticks.get(level)
+    for p in PHASES:
+        row[f"phase_{p}"] = phase_ticks.get(p)
+    return row
+
+def parse_override(text):
+    # "boss_hp=350", "boss_fire_rates=0.02,0.05,0.08", "level3.hitbox=20x40", ...
+    key, sep, value = text.partition("=")
+    if not sep:
+        raise ValueError(f"expected key=value, got {text!r}")
+    key = key.strip()
+    if key == "boss_hp":
+        return key, int(value)
+    if key == "boss_shield_chance":
+        return key, float(value)
+    if key == "boss_fire_rates":
+        rates = [float(v) for v in value.split(",")]
+        if len(rates) != len(PHASES):
+            raise ValueError("boss_fire_rates needs one rate per phase")
+        return key, rates
+    level, dot, field = key.partition(".")
+    if dot and level.startswith("level") and level[5:].isdigit():
+        if field == "hitbox":
+            w, _, h = value.lower().partition("x")
+            return key, (int(w), int(h))
+        if field == "projectile_speed":
+            return key, int(value)
+        if field == "powerup_chance":
+            return key, float(value)
+    raise ValueError(f"unknown tuning key {key!r}")
+
+def apply_overrides(overrides):
+    for key, value in overrides:
+        if key == "boss_hp":
+            game.BOSS_HP = value
+        elif key == "boss_shield_chance":
+            game.BOSS_SHIELD_CHANCE = value
+        elif key == "boss_fire_rates":
+            game.BOSS_FIRE_RATES = dict(zip(PHASES, value))
+        else:
+            level, field = key.split(".")
+            level = int(level[5:])
+            tuning = dict(game.level_tuning(level))
+            tuning[field] = value
+            game.LEVEL_TUNING[level] = tuning
+
+def run_chunk(seeds, policy_name, max_ticks):
+    return [play_game(seed, policy_name, max_ticks) for seed in seeds]
+
+def distribution(values):
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return {"count": 0}
+
+    def pct(p):
+        return values[min(len(values) - 1, int(p / 100 * len(values)))]
+    return {"count": len(values), "mean": sum(values) / len(values), "min": values[0],
+            "p5": pct(5), "p50": pct(50), "p95": pct(95), "max": values[-1]}
+
+def summarize(rows, args, wall):
+    outcomes = {}
+    for row in rows:
+        outcomes[row["outcome"]] = outcomes.get(row["outcome"], 0) + 1
+    return {
+        "games": len(rows),
+        "policy": args.policy,
+        "seed": args.seed,
+        "max_ticks": args.max_ticks,
+        "overrides": dict((k, v) for k, v in args.overrides),
+        "wall_seconds": wall,
+        "games_per_second": len(rows) / wall if wall else None,
+        "outcome_rates": {k: v / len(rows) for k, v in sorted(outcomes.items())},
+        "death_rate": outcomes.get("death", 0) / len(rows),
+        "score": distribution(r["score"] for r in rows),
+        "clear_ticks": {str(level): distribution(r[f"clear_{level}"] for r in rows) for level in LEVELS},
+        "boss_phase_ticks": {str(p): distribution(r[f"phase_{p}"] for r in rows) for p in PHASES},
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run seeded headless playthroughs and report difficulty stats.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="scripted")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS, help="ticks before a game counts as a timeout")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="KEY=VALUE",
+                        help="tuning override: boss_hp, boss_shield_chance, boss_fire_rates=a,b,c, "
+                             "levelN.hitbox=WxH, levelN.projectile_speed, levelN.powerup_chance")
+    parser.add_argument("--json", help="write the summary report here (default: stdout)")
+    parser.add_argument("--csv", help="write one row per game here")
+    args = parser.parse_args(argv)
+    if args.games < 1:
+        parser.error("--games must be at least 1")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    try:
+        args.overrides = [parse_override(text) for text in args.overrides]
+    except ValueError as exc:
+        parser.error(str(exc))
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    apply_overrides(args.overrides)
+    seeds = list(range(args.seed, args.seed + args.games))
+    start = time.perf_counter()
+    if args.workers <= 1:
+        rows = run_chunk(seeds, args.policy, args.max_ticks)
+    else:
+        # Several chunks per worker keeps every core busy until the end
+        size = max(1, len(seeds) // (args.workers * 8))
+        chunks = [seeds[i:i + size] for i in range(0, len(seeds), size)]
+        rows = []
+        with ProcessPoolExecutor(args.workers, initializer=apply_overrides, initargs=(args.overrides,)) as pool:
+            for chunk_rows in pool.map(run_chunk, chunks, [args.policy] * len(chunks), [args.max_ticks] * len(chunks)):
+                rows.extend(chunk_rows)
+    wall = time.perf_counter() - start
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["seed"])
+            writer.writeheader()
+            writer.writerows(rows)
+    report = json.dumps(summarize(rows, args, wall), indent=2)
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# Reproducible benchmarks for the frame-time hot paths.
+#
+#   python -m benchmarks                                # run everything, print a table
+#   python -m benchmarks --json results.json            # also save the results
+#   python -m benchmarks --baseline results.json        # fail on regressions
+#   python -m benchmarks -k boss -k sparks              # only matching benchmarks
+#
+# Micro benchmarks time one call of a single hot function; scenarios time
+# whole frames (GameState.step plus Renderer.draw) of a staged situation.
+# Everything draws to the offscreen display of SDL's dummy video driver and
+# is seeded, so two runs on one machine do the same work.
+
+import os
+import platform
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import numpy as np
+import pygame
+import brickshooting as game
+import snapshot
+
+SEED = 1234
+WARMUP = 10  # untimed samples first, so caches and the sprite atlas are filled
+PERCENTILES = (50, 95, 99)
+
+# name -> (group, factory); factory() returns (setup, run) and each sample
+# times run(setup()), with setup excluded
+BENCHMARKS = {}
+
+def benchmark(group, name=None):
+    def register(factory):
+        BENCHMARKS[name or factory.__name__] = (group, factory)
+        return factory
+    return register
+
+def init():
+    # Offscreen display and fonts; safe to call more than once
+    if game.screen is None:
+        game.init_display()
+    return game.screen
+
+def staged_state(level, seed=SEED):
+    # A fresh game on the given level, as if the player had just got there
+    state = game.GameState(seed=seed)
+    while state.level < level:
+        state.advance_level()
+    state.events = []
+    return state
+
+def fresh(state):
+    # A full restore, so no copy-on-write copying lands in the timed call
+    data = snapshot.dump(state)
+    return lambda: snapshot.load(data)
+
+def measure(factory, samples, warmup=WARMUP):
+    setup, run = factory()
+    times = []
+    for i in range(warmup + samples):
+        arg = setup()
+        start = time.perf_counter_ns()
+        run(arg)
+        elapsed = time.perf_counter_ns() - start
+        if i >= warmup:
+            times.append(elapsed / 1e6)
+    return times
+
+def summarize(times):
+    values = np.asarray(times)
+    stats = {"samples": len(values), "mean": float(values.mean()), "min": float(values.min()),
+             "max": float(values.max())}
+    for p in PERCENTILES:
+        stats[f"p{p}"] = float(np.percentile(values, p))
+    return stats
+
+def run(names=None, samples=200):
+    # Times are milliseconds. Scenario samples are frames, so a scenario
+    # run gets the same sample count as a micro benchmark
+    init()
+    random.seed(SEED)
+    results = {}
+    for name, (group, factory) in BENCHMARKS.items():
+        if names is not None and name not in names:
+            continue
+        results[name] = dict(group=group, **summarize(measure(factory, samples)))
+    return {"meta": environment(samples), "results": results}
+
+def environment(samples):
+    return {"python": platform.python_version(), "pygame": pygame.version.ver, "numpy": np.__version__,
+            "machine": platform.machine(), "platform": sys.platform, "samples": samples,
+            "video_driver": os.environ.get("SDL_VIDEODRIVER")}
+
+def compare(report, baseline, tolerance=0.10, metric="p50"):
+    # (name, baseline ms, current ms, ratio, regressed) for benchmarks in both
+    rows = []
+    old = baseline.get("results", {})
+    for name, stats in report["results"].items():
+        if name not in old:
+            continue
+        before = old[name][metric]
+        after = stats[metric]
+        ratio = after / before if before else float("inf")
+        rows.append((name, before, after, ratio, ratio > 1 + tolerance))
+    return rows
+
+from . import micro, scenarios  # noqa: E402,F401  (register the benchmarks)
@@ -0,0 +1,48 @@
+import argparse
+import json
+import sys
+
+from . import BENCHMARKS, compare, run
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Time the frame-time hot paths.")
+    parser.add_argument("-k", dest="patterns", action="append", metavar="TEXT",
+                        help="only run benchmarks whose name contains TEXT (repeatable)")
+    parser.add_argument("--samples", type=int, default=200, help="timed calls (or frames) per benchmark")
+    parser.add_argument("--json", help="write the results here")
+    parser.add_argument("--baseline", help="compare against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before a regression, as a fraction")
+    parser.add_argument("--metric", choices=["p50", "p95", "p99"], default="p50", help="statistic compared to the baseline")
+    parser.add_argument("--list", action="store_true", help="list the benchmarks and exit")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = [name for name in BENCHMARKS if not args.patterns or any(p in name for p in args.patterns)]
+    if args.list:
+        for name in names:
+            print(f"{BENCHMARKS[name][0]:9} {name}")
+        return 0
+    report = run(names, args.samples)
+
+    print(f"{'benchmark':24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stats in report["results"].items():
+        print(f"{name:24} {stats['p50']:9.3f} {stats['p95']:9.3f} {stats['p99']:9.3f} {stats['max']:9.3f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.tolerance, args.metric)
+        print(f"\n{'vs baseline (' + args.metric + ')':24} {'before':>9} {'after':>9} {'ratio':>9}")
+        for name, before, after, ratio, regressed in rows:
+            print(f"{name:24} {before:9.3f} {after:9.3f} {ratio:8.2f}x{'  REGRESSION' if regressed else ''}")
+        if any(row[4] for row in rows):
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
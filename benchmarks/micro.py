@@ -0,0 +1,171 @@
+# One call of each hot function against a staged state
+
+import random
+
+import pygame
+
+import brickshooting as game
+import snapshot
+from . import SEED, benchmark, fresh, init, staged_state
+
+SHOTS = 200
+SPARKS = 500
+FIREBALLS = 300
+STARS = 5000
+
+def volley(state, count, rng):
+    # Shots spread over the play field below the wall, flying upward
+    for _ in range(count):
+        state.projectiles.spawn(rng.uniform(0, game.WIDTH), rng.uniform(200, game.HEIGHT - 60), state.level,
+                                rng.uniform(-30, 30))
+
+def touch_bricks(field, rng, count=3):
+    # Marks a few bricks dirty without changing them, as hits do every frame
+    bricks = list(field)
+    for brick in rng.sample(bricks, min(count, len(bricks))):
+        field.damage(brick)
+        brick.hp += 1
+    return field
+
+@benchmark("micro")
+def projectile_update():
+    rng = random.Random(SEED)
+    state = staged_state(4)
+    volley(state, SHOTS, rng)
+    state.projectiles.update(state)  # moves everything once so hits are mid-flight
+    return fresh(state), lambda s: s.projectiles.update(s)
+
+@benchmark("micro")
+def draw_bricks():
+    # Steady state: the cached layer plus a few dirty cells
+    surface = init()
+    rng = random.Random(SEED)
+    field = staged_state(4).bricks
+    return lambda: touch_bricks(field, rng), lambda f: game.draw_bricks(surface, f)
+
+@benchmark("micro")
+def draw_bricks_rebuild():
+    # A new field, as on a level change: the whole layer is redrawn
+    surface = init()
+    field = staged_state(4).bricks
+
+    def setup():
+        field.dirty_all = True
+        return field
+    return setup, lambda f: game.draw_bricks(surface, f)
+
+@benchmark("micro")
+def draw_sparks():
+    surface = init()
+    rng = random.Random(SEED)
+    sparks = game.SparkPool()
+    while len(sparks) < SPARKS:
+        sparks.emit(rng.uniform(0, game.WIDTH), rng.uniform(60, 300), rng, amount=20)
+    return lambda: sparks, lambda s: game.draw_sparks(surface, s)
+
+@benchmark("micro")
+def starfield():
+    # Attract-mode density: move and stamp the whole field
+    surface = init()
+    stars = game.Starfield(STARS, SEED)
+
+    def run(s):
+        s.update()
+        game.draw_stars(surface, s)
+    return lambda: stars, run
+
+@benchmark("micro")
+def draw_text():
+    # A cached HUD string
+    surface = init()
+    return lambda: surface, lambda s: game.draw_text(s, "Hold SPACE for rapid fire! Defeat the Dinosaur Boss!",
+                                                     game.small_font, game.WHITE, game.WIDTH // 2, game.HEIGHT - 20)
+
+@benchmark("micro")
+def draw_text_uncached():
+    surface = init()
+    text = "Level 4 (Very Hard)"
+
+    def setup():
+        game.text_cache.pop((text, game.small_font, game.WHITE), None)
+        return surface
+    return setup, lambda s: game.draw_text(s, text, game.small_font, game.WHITE, game.WIDTH - 150, 30, center=False)
+
+@benchmark("micro")
+def draw_counter():
+    # A changing score: cached label plus per-digit glyphs
+    surface = init()
+    scores = iter(range(10 ** 9))
+    return lambda: next(scores) * 10, lambda score: game.draw_counter(surface, "Score: ", score, game.small_font,
+                                                                    game.WHITE, 80, 30, center=False)
+
+@benchmark("micro")
+def draw_boss():
+    surface = init()
+    boss = staged_state(5).boss
+    hp = iter(range(10 ** 9))
+
+    def setup():
+        boss.hp = game.BOSS_HP - next(hp) % game.BOSS_HP
+        return boss
+    return setup, lambda b: game.draw_boss(surface, b)
+
+def barrage(state, count, rng):
+    # Fireballs strewn between the boss and the character
+    for _ in range(count):
+        state.boss_projectiles.spawn(rng.randrange(0, game.WIDTH - 10), rng.randrange(100, game.HEIGHT - 120))
+
+@benchmark("micro")
+def fireball_update():
+    rng = random.Random(SEED)
+    state = staged_state(5)
+    barrage(state, FIREBALLS, rng)
+    return fresh(state), lambda s: s.boss_projectiles.update(s)
+
+@benchmark("micro")
+def draw_fireballs():
+    surface = init()
+    rng = random.Random(SEED)
+    state = staged_state(5)
+    barrage(state, FIREBALLS, rng)
+    return lambda: state.boss_projectiles, lambda f: game.draw_projectiles(surface, f)
+
+@benchmark("micro")
+def update_boss():
+    # Phase 3: fastest movement, triple shots and shield spawns
+    state = staged_state(5)
+    state.boss.hp = state.boss.max_hp // 5
+
+    def setup():
+        state.boss_projectiles.clear()
+        return state
+    return setup, game.update_boss
+
+def midgame():
+    # Level 4 with shots, sparks and a dented wall in flight
+    state = staged_state(4)
+    for _ in range(120):
+        state.step(game.Inputs(left=state.tick % 60 < 30, right=state.tick % 60 >= 30, fire=True))
+    return state
+
+@benchmark("micro")
+def snapshot_dump():
+    state = midgame()
+    return lambda: state, snapshot.dump
+
+@benchmark("micro")
+def snapshot_load():
+    data = snapshot.dump(midgame())
+    return lambda: data, snapshot.load
+
+@benchmark("micro")
+def clone():
+    state = midgame()
+    return lambda: state, lambda s: s.clone()
+
+@benchmark("micro")
+def upscale():
+    # Presenting a finished world frame on a window twice its size
+    world = init()
+    upscaler = game.Upscaler(pygame.Surface((game.WIDTH * 2, game.HEIGHT * 2)).convert())
+    return lambda: world, upscaler.present
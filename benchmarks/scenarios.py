@@ -0,0 +1,77 @@
+# Whole frames, GameState.step plus Renderer.draw, of staged situations. Each
+# sample is one frame of a continuous seeded run; setup tops the situation up
+# between frames, untimed, so it holds for the whole run
+
+import random
+
+import brickshooting as game
+from . import SEED, benchmark, init, staged_state
+from .micro import volley
+
+STORM = 2000
+SPARKS = 500
+SHIELDS = 12
+
+def sweep(tick):
+    # Hold fire and walk back and forth across the screen
+    right = (tick // 60) % 2 == 0
+    return game.Inputs(left=not right, right=right, fire=True)
+
+def frames(state, prepare=None):
+    renderer = game.Renderer(init(), seed=SEED)
+
+    def setup():
+        if prepare:
+            prepare(state)
+        # A fireball hit would end the game and freeze the simulation
+        state.game_over = False
+        return state
+
+    def run(s):
+        s.step(sweep(s.tick))
+        renderer.draw(s)
+    return setup, run
+
+def keep_boss_alive(state, floor):
+    state.boss.hp = max(state.boss.hp, floor)
+
+@benchmark("scenario")
+def level4_wall():
+    return frames(staged_state(4))
+
+@benchmark("scenario")
+def projectile_storm():
+    # 2,000 live shots every frame against the boss, which cannot die
+    rng = random.Random(SEED)
+    state = staged_state(5)
+    state.boss.max_hp = state.boss.hp = 10 ** 9
+
+    def prepare(s):
+        keep_boss_alive(s, 10 ** 8)
+        volley(s, STORM - len(s.projectiles), rng)
+    return frames(state, prepare)
+
+@benchmark("scenario")
+def spark_burst():
+    # 500 sparks alive at once over the level-4 wall
+    rng = random.Random(SEED)
+
+    def prepare(s):
+        while len(s.sparks) < SPARKS:
+            s.sparks.emit(rng.uniform(0, game.WIDTH), rng.uniform(60, 300), rng, amount=20)
+    return frames(staged_state(4), prepare)
+
+@benchmark("scenario")
+def boss_phase3_shields():
+    # Phase 3 boss with a dozen 4-hit shields up
+    rng = random.Random(SEED)
+    state = staged_state(5)
+    state.boss.hp = state.boss.max_hp // 5
+    for _ in range(SHIELDS):
+        x = rng.randint(0, game.BRICK_COLS - 1) * game.BRICK_WIDTH + 2
+        y = rng.randint(2, 4) * game.BRICK_HEIGHT + game.BRICK_TOP
+        state.bricks.add(game.Brick(game.pygame.Rect(x, y, game.BRICK_WIDTH - 4, game.BRICK_HEIGHT - 4), 4))
+
+    def prepare(s):
+        keep_boss_alive(s, s.boss.max_hp // 10)
+    return frames(state, prepare)
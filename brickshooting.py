@@ -1,17 +1,40 @@
 import pygame
 import sys
+if __name__ == "__main__":
+    # snapshot.py and replay.py import this module by name; run as a script,
+    # they must get this copy rather than load a second one with its own
+    # quality, profiler, caches and levels
+    sys.modules.setdefault("brickshooting", sys.modules[__name__])
 import random
 import os 
+import math
+import argparse
+import time
+import copy
+import logging
+import numpy as np
+from collections import OrderedDict, namedtuple
+from itertools import repeat
+from profiler import Profiler
+from assets import Assets, Preloader
+from voices import Voice, VoiceManager
+from levels import EndlessRows, load_levels
+from governor import Governor
 
 # Game settings
 WIDTH, HEIGHT = 800, 600
 FPS = 60
+STEP_MS = 1000 / FPS  # fixed simulation tick, independent of the render rate
+MAX_STEPS_PER_FRAME = 5  # drop backlog instead of spiralling after a long stall
+AUTOSAVE_TICKS = FPS * 5  # kiosk saves, see --autosave
 
 # Brick Breaker config
 BRICK_ROWS = 6
 BRICK_COLS = 10
 BRICK_WIDTH = WIDTH // BRICK_COLS
 BRICK_HEIGHT = 30
+BRICK_TOP = 60  # y offset of the first brick row
+BRICK_GRID_ROWS = (HEIGHT - BRICK_TOP) // BRICK_HEIGHT + 1
 PADDLE_WIDTH, PADDLE_HEIGHT = 120, 20
 BALL_RADIUS = 20
 
@@ -20,6 +43,8 @@ WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 BG_COLOR = (30, 30, 40)
 BRICK_COLORS = [(255, 99, 71), (255, 215, 0), (50, 205, 50), (70, 130, 180), (138, 43, 226), (255, 105, 180)]
+# Per base color: 1-hit, 2-hit (darker) and 3+-hit (much darker) shades
+BRICK_SHADES = [[c, tuple(max(0, v - 50) for v in c), tuple(max(0, v - 100) for v in c)] for c in BRICK_COLORS]
 # Human character colors
 SKIN_COLOR = (255, 220, 177)  # Skin tone
 SHIRT_COLOR = (50, 150, 255)  # Blue shirt
@@ -34,124 +59,611 @@ DINO_SPOTS_COLOR = (0, 100, 0)      # Dark green spots
 DINO_EYE_COLOR = (255, 0, 0)        # Red eyes
 DINO_TEETH_COLOR = (255, 255, 255)  # White teeth
 
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Human vs Dinosaur - Brick Shooter!")
-clock = pygame.time.Clock()
-font = pygame.font.SysFont("Segoe UI", 32, bold=True)
-small_font = pygame.font.SysFont("Segoe UI", 18, bold=True)
+# Display, fonts and audio are only set up by init_display() / AudioPlayer, so
+# the simulation below can be imported and run without a window or mixer.
+# screen is the WIDTH x HEIGHT surface the game is drawn on; with an upscaled
+# window it is offscreen and the Upscaler presents it
+screen = None
+upscaler = None
+clock = None
+font = None
+small_font = None
+bg_image = None
+# Main-loop section timers and counters; every hook is a no-op until enabled
+profiler = Profiler()
 
 base_path = os.path.dirname(__file__)
 
-# Background music
 music_path = os.path.join(base_path, "bg.mp3.mp3")
-if os.path.exists(music_path):
-    pygame.mixer.music.load(music_path)
-    pygame.mixer.music.play(-1)
-    pygame.mixer.music.set_volume(0.1)
-
-# Game Over sound
 gameover_path = os.path.join(base_path, "gameover.wav.mp3")
-if os.path.exists(gameover_path):
-    gameover_sound = pygame.mixer.Sound(gameover_path)
-else:
-    gameover_sound = None
-    
 win_path = os.path.join(base_path, "win.wav.mp3")
-if os.path.exists(win_path):
-    win_sound = pygame.mixer.Sound(win_path)
-else:
-    win_sound = None    
-
 # Brick Hit sound
 brickshooting_path = os.path.join(base_path, "brickshooting.wav.wav")
 brickhit_path = os.path.join(base_path, "brickhit.wav.wav")
-selected_hit_path = None
-if os.path.exists(brickshooting_path):
-    selected_hit_path = brickshooting_path
-elif os.path.exists(brickhit_path):
-    selected_hit_path = brickhit_path
-
-if selected_hit_path:
-    brickhit_sound = pygame.mixer.Sound(selected_hit_path)
-    brickhit_sound.set_volume(1.0)
-else:
-    brickhit_sound = None
-
 # Powerup sounds
 hit_sound_path = os.path.join(base_path, "hit.wav.mp3")
 powerup_sound_path = os.path.join(base_path, "powerup.wav.mp3")
 boss_sound_path = os.path.join(base_path, "bosshit.wav.mp3")
+bg_path = os.path.join(base_path, "background.jpg")
+# Decoded sounds are cached here between launches
+cache_dir = os.path.join(base_path, ".asset-cache")
+assets = Assets(cache_dir)
 
-hit_sound = pygame.mixer.Sound(hit_sound_path) if os.path.exists(hit_sound_path) else None
-powerup_sound = pygame.mixer.Sound(powerup_sound_path) if os.path.exists(powerup_sound_path) else None
-boss_hit_sound = pygame.mixer.Sound(boss_sound_path) if os.path.exists(boss_sound_path) else None
+# HUD fonts per scale factor, for HUD text drawn at native resolution
+hud_font_cache = {}
 
-# Background
-bg_path = os.path.join(base_path, "background.jpg")
-if os.path.exists(bg_path):
-    bg_image = pygame.image.load(bg_path)
-    bg_image = pygame.transform.scale(bg_image, (WIDTH, HEIGHT))
-else:
-    bg_image = None
-
-# Level system
-LEVEL = 1
-FINAL_LEVEL = 5
+def load_fonts():
+    global font, small_font
+    pygame.font.init()
+    font = pygame.font.SysFont("Segoe UI", 32, bold=True)
+    small_font = pygame.font.SysFont("Segoe UI", 18, bold=True)
+    hud_font_cache.clear()
+    hud_font_cache[1] = (font, small_font)
+
+def hud_fonts(scale):
+    # (font, small_font) at scale times their size
+    if scale not in hud_font_cache:
+        hud_font_cache[scale] = (pygame.font.SysFont("Segoe UI", 32 * scale, bold=True),
+                                 pygame.font.SysFont("Segoe UI", 18 * scale, bold=True))
+    return hud_font_cache[scale]
+
+def load_background():
+    global bg_image
+    if os.path.exists(bg_path):
+        bg_image = assets.image(bg_path, (WIDTH, HEIGHT))
+    else:
+        bg_image = None
+
+class Upscaler:
+    # Presents the WIDTH x HEIGHT world on a bigger window at the largest whole
+    # multiple that fits, centred and letterboxed. Drawing cost stays that of
+    # the world surface whatever the window size; the upscale is one
+    # nearest-neighbour transform.scale into a view of the window, which keeps
+    # pixels square and allocates nothing per frame. The window must be at
+    # least WIDTH x HEIGHT
+    def __init__(self, window, native_hud=False):
+        self.window = window
+        ww, wh = window.get_size()
+        if not fits((ww, wh)):
+            raise ValueError(f"a {ww}x{wh} window is smaller than the {WIDTH}x{HEIGHT} game")
+        self.factor = fit_factor((ww, wh))
+        self.rect = pygame.Rect(0, 0, WIDTH * self.factor, HEIGHT * self.factor)
+        self.rect.center = (ww // 2, wh // 2)
+        self.view = window.subsurface(self.rect)
+        # native_hud: HUD text is drawn on the upscaled view with fonts
+        # factor times larger, rather than upscaled with the world
+        self.native_hud = native_hud
+        window.fill(BLACK)
+
+    def present(self, world):
+        with profiler.section("draw.upscale"):
+            pygame.transform.scale(world, self.rect.size, self.view)
+
+def fits(size):
+    return size[0] >= WIDTH and size[1] >= HEIGHT
+
+def fit_factor(size):
+    # Largest whole multiple of WIDTH x HEIGHT that fits in size, at least 1
+    return max(1, min(size[0] // WIDTH, size[1] // HEIGHT))
+
+def init_display(background=True, scaling="native", fullscreen=False, window_size=None, native_hud=False):
+    # background=False leaves the background image to the caller, see loading_screen().
+    # scaling: "native" opens a WIDTH x HEIGHT window; "scaled" lets SDL
+    # stretch that same surface over a bigger window or the whole screen on
+    # the GPU; "integer" draws offscreen and blits through an Upscaler onto a
+    # window_size window (default: the biggest multiple that fits the desktop)
+    global screen, upscaler, clock
+    pygame.init()
+    flags = pygame.FULLSCREEN if fullscreen else 0
+    upscaler = None
+    if scaling == "integer" and fullscreen and not fits(pygame.display.get_desktop_sizes()[0]):
+        scaling = "native"  # nothing to upscale: the screen switches to a WIDTH x HEIGHT mode
+    if scaling == "scaled":
+        screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED | flags)
+    elif scaling == "integer":
+        if fullscreen:
+            window = pygame.display.set_mode((0, 0), flags)
+        else:
+            if window_size is None:
+                k = fit_factor(pygame.display.get_desktop_sizes()[0])
+                window_size = (WIDTH * k, HEIGHT * k)
+            window = pygame.display.set_mode(window_size)
+        upscaler = Upscaler(window, native_hud)
+        screen = pygame.Surface((WIDTH, HEIGHT)).convert()
+    else:
+        screen = pygame.display.set_mode((WIDTH, HEIGHT), flags)
+    pygame.display.set_caption("Human vs Dinosaur - Brick Shooter!")
+    clock = pygame.time.Clock()
+    load_fonts()
+    if background:
+        load_background()
+    return screen
+
+def start_music():
+    # Background music
+    if os.path.exists(music_path):
+        pygame.mixer.music.load(music_path)
+        pygame.mixer.music.play(-1)
+        pygame.mixer.music.set_volume(0.1)
+
+# Sound files for each event name a GameState step can report; the first
+# one that exists is used
+SOUND_PATHS = {
+    "game_over": [gameover_path],
+    "level_cleared": [win_path],
+    "brick_hit": [brickshooting_path, brickhit_path],
+    "player_hit": [hit_sound_path],
+    "powerup": [powerup_sound_path],
+    "boss_hit": [boss_sound_path],
+}
+# Only heard in the boss fight, so they are prefetched during level 4
+BOSS_SOUNDS = ("boss_hit", "player_hit")
+STARTUP_SOUNDS = tuple(event for event in SOUND_PATHS if event not in BOSS_SOUNDS)
+# Mixer voices per sound (see voices.py). Hits fire many times a second in
+# rapid fire, so they merge into fewer, louder plays on a few channels
+SOUND_VOICES = {
+    "brick_hit": Voice(channels=3, window=60, volume=0.6, boost=0.1),
+    "boss_hit": Voice(channels=3, window=60, volume=0.6, boost=0.1),
+    "powerup": Voice(channels=1, window=100),
+    "player_hit": Voice(channels=1, window=200),
+    "game_over": Voice(channels=1, window=500),
+    "level_cleared": Voice(channels=1, window=500),
+}
+
+def load_sound(event):
+    for path in SOUND_PATHS.get(event, ()):
+        if os.path.exists(path):
+            return assets.sound(path)
+    return None
+
+class AudioPlayer:
+    # Observer that plays the sounds for the events of the last step. Each
+    # sound is loaded the first time its event fires. With a Preloader the
+    # load runs on a worker thread and the event stays silent until it is done
+    def __init__(self, preloader=None):
+        self.sounds = {}
+        self.preloader = preloader
+        self.loading = {}  # event -> future of its sound
+        self.voices = VoiceManager(SOUND_VOICES)
+
+    def sound(self, event):
+        if event not in self.sounds:
+            if self.preloader is None:
+                self.sounds[event] = load_sound(event)
+            else:
+                future = self.loading.get(event)
+                if future is None:
+                    self.loading[event] = self.preloader.submit(load_sound, event)
+                    return None
+                if not future.done():
+                    return None
+                self.sounds[event] = future.result()
+        return self.sounds[event]
+
+    def preload(self, events=SOUND_PATHS):
+        for event in events:
+            self.sound(event)
+
+    def play(self, events):
+        for event in events:
+            sound = self.sound(event)
+            if sound:
+                profiler.count("voice_" + self.voices.play(event, sound))
+
+# Level system: levels/*.json, played in file name order (see levels.py)
+level_dir = os.path.join(base_path, "levels")
+LEVELS = load_levels(level_dir, BRICK_COLS, os.path.join(cache_dir, "levels"))
+FINAL_LEVEL = len(LEVELS)
 BOSS_HP = 500
 
+# Difficulty tuning per level, from the level files; levels past the table
+# use its last entry. Kept as a table so balance.py can sweep it
+LEVEL_TUNING = {n: level.tuning for n, level in enumerate(LEVELS, 1)}
+
+# Endless mode: a new row streams in at the top every ENDLESS_SCROLL_TICKS,
+# pushing the others down, and rows leaving the ENDLESS_WINDOW are dropped
+ENDLESS_WINDOW = 8
+ENDLESS_START_ROWS = 4
+ENDLESS_SCROLL_TICKS = 180
+ENDLESS_LEVEL = max(n for n, level in enumerate(LEVELS, 1) if not level.boss)  # its tuning applies
+# Boss fire chance per frame by phase; much more aggressive in the final phase
+BOSS_FIRE_RATES = {1: 0.03, 2: 0.06, 3: 0.1}
+BOSS_SHIELD_CHANCE = 0.02  # per frame in phase 3
+
+def level_tuning(level):
+    return LEVEL_TUNING.get(level) or LEVEL_TUNING[max(LEVEL_TUNING)]
+
+def sweep_time(rect, dx, dy, target):
+    # Swept AABB: the time in [0, 1) at which rect, moving by (dx, dy), first
+    # overlaps target, or None if it never does. Overlap is strict like
+    # Rect.colliderect, so the end position alone gives the same answer as
+    # colliderect, and anything crossed on the way is caught too
+    enter, leave = 0.0, 1.0
+    for lo, hi, d, target_lo, target_hi in ((rect.left, rect.right, dx, target.left, target.right),
+                                            (rect.top, rect.bottom, dy, target.top, target.bottom)):
+        if d == 0:
+            if hi <= target_lo or lo >= target_hi:
+                return None
+            continue
+        t0 = (target_lo - hi) / d
+        t1 = (target_hi - lo) / d
+        if t0 > t1:
+            t0, t1 = t1, t0
+        enter = max(enter, t0)
+        leave = min(leave, t1)
+        if enter >= leave:
+            return None
+    return enter
+
+class Brick:
+    __slots__ = ("rect", "hp")
+
+    def __init__(self, rect, hp):
+        self.rect = rect
+        self.hp = hp
+
+class BrickField:
+    # Uniform grid over the brick layout: one cell per BRICK_WIDTH x BRICK_HEIGHT slot
+    # starting at BRICK_TOP, so a projectile only tests the cells it overlaps
+    def __init__(self, bricks=()):
+        self.cells = {}   # (col, row) -> bricks overlapping that cell
+        self.bricks = {}  # id(brick) -> brick, keeps insertion order for drawing
+        # Brick count per on-screen cell, for batched broad-phase checks
+        self.occupancy = np.zeros((BRICK_GRID_ROWS, BRICK_COLS), dtype=np.int16)
+        self.offgrid = {}  # bricks reaching outside the occupancy grid
+        self.dirty = set()  # cells whose bricks changed since the last draw
+        self.dirty_all = True
+        self.shared = False  # bricks shared with a clone, see share()
+        for brick in bricks:
+            self.add(brick)
+
+    def share(self):
+        # Copy-on-write clone: both fields use the same bricks until either
+        # one changes, which then copies them first. Callers about to change a
+        # brick they looked up must call own() before the lookup
+        clone = object.__new__(BrickField)
+        clone.__dict__.update(self.__dict__)
+        clone.dirty = set(self.dirty)
+        self.shared = clone.shared = True
+        return clone
+
+    def own(self):
+        if not self.shared:
+            return
+        bricks = list(self)
+        dirty, dirty_all = self.dirty, self.dirty_all
+        self.cells = {}
+        self.bricks = {}
+        self.occupancy = np.zeros_like(self.occupancy)
+        self.offgrid = {}
+        self.shared = False
+        for brick in bricks:
+            self.add(Brick(brick.rect.copy(), brick.hp))
+        self.dirty, self.dirty_all = dirty, dirty_all
+
+    def cell_span(self, rect):
+        col0 = rect.left // BRICK_WIDTH
+        col1 = (rect.right - 1) // BRICK_WIDTH
+        row0 = (rect.top - BRICK_TOP) // BRICK_HEIGHT
+        row1 = (rect.bottom - 1 - BRICK_TOP) // BRICK_HEIGHT
+        return col0, col1, row0, row1
+
+    def on_grid(self, col0, col1, row0, row1):
+        return col0 >= 0 and col1 < BRICK_COLS and row0 >= 0 and row1 < BRICK_GRID_ROWS
+
+    def add(self, brick):
+        self.own()
+        col0, col1, row0, row1 = self.cell_span(brick.rect)
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                self.cells.setdefault((col, row), []).append(brick)
+                self.dirty.add((col, row))
+        if self.on_grid(col0, col1, row0, row1):
+            self.occupancy[row0:row1 + 1, col0:col1 + 1] += 1
+        else:
+            self.offgrid[id(brick)] = brick
+        self.bricks[id(brick)] = brick
+
+    def remove(self, brick):
+        self.own()
+        col0, col1, row0, row1 = self.cell_span(brick.rect)
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                cell = self.cells[(col, row)]
+                cell.remove(brick)  # a cell only ever holds a brick or two
+                if not cell:
+                    del self.cells[(col, row)]
+                self.dirty.add((col, row))
+        if self.on_grid(col0, col1, row0, row1):
+            self.occupancy[row0:row1 + 1, col0:col1 + 1] -= 1
+        else:
+            del self.offgrid[id(brick)]
+        del self.bricks[id(brick)]
+
+    def damage(self, brick):
+        self.own()
+        brick.hp -= 1
+        col0, col1, row0, row1 = self.cell_span(brick.rect)
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                self.dirty.add((col, row))
+
+    def overlaps_any(self, left, top, right, bottom):
+        # Broad phase for arrays of rects: True where any overlapped cell holds a brick
+        if self.offgrid:
+            return np.ones(len(left), dtype=bool)
+        found = np.zeros(len(left), dtype=bool)
+        if not self.bricks:
+            return found
+        col0 = left // BRICK_WIDTH
+        col1 = (right - 1) // BRICK_WIDTH
+        row0 = (top - BRICK_TOP) // BRICK_HEIGHT
+        row1 = (bottom - 1 - BRICK_TOP) // BRICK_HEIGHT
+        # Swept rects can span more than two cells a side
+        for dr in range(int((row1 - row0).max()) + 1):
+            row = np.minimum(row0 + dr, row1)
+            for dc in range(int((col1 - col0).max()) + 1):
+                col = np.minimum(col0 + dc, col1)
+                inside = (col >= 0) & (col < BRICK_COLS) & (row >= 0) & (row < BRICK_GRID_ROWS)
+                cells = self.occupancy[np.clip(row, 0, BRICK_GRID_ROWS - 1), np.clip(col, 0, BRICK_COLS - 1)]
+                found |= inside & (cells > 0)
+        return found
+
+    def sweep(self, rect, dx, dy):
+        # First brick hit by rect moving by (dx, dy), as (brick, time of
+        # impact in [0, 1)); ties go to the first brick scanning the cells
+        # top-left to bottom-right
+        if not self.cells:
+            return None, None
+        swept = rect.union(rect.move(dx, dy))
+        col0, col1, row0, row1 = self.cell_span(swept)
+        first, first_t = None, None
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                for brick in self.cells.get((col, row), ()):
+                    if not swept.colliderect(brick.rect):
+                        continue
+                    t = sweep_time(rect, dx, dy, brick.rect)
+                    if t is not None and (first_t is None or t < first_t):
+                        first, first_t = brick, t
+        return first, first_t
+
+    def clear(self):
+        # New containers rather than emptied ones, which a clone may share
+        self.cells = {}
+        self.bricks = {}
+        self.occupancy = np.zeros_like(self.occupancy)
+        self.offgrid = {}
+        self.dirty.clear()
+        self.dirty_all = True
+        self.shared = False
+
+    def __setstate__(self, state):
+        # Bricks are keyed by id(), which changes when a field is copied or unpickled
+        self.__dict__.update(state)
+        self.shared = False
+        self.bricks = {id(brick): brick for brick in self.bricks.values()}
+        self.offgrid = {id(brick): brick for brick in self.offgrid.values()}
+
+    def __iter__(self):
+        return iter(self.bricks.values())
+
+    def __len__(self):
+        return len(self.bricks)
+
 # Stars for background animation
 STAR_COUNT = 80
-stars = [{"x": random.randint(0, WIDTH), "y": random.randint(0, HEIGHT), "speed": random.randint(1, 3)} for _ in range(STAR_COUNT)]
-sparks = []
-powerups = []
-boss_projectiles = []
-bricks = []  # moved global for boss shields
-projectiles = []  # player projectiles
-
-def draw_background(surface):
+STAR_RADIUS = 2
+SPARK_CAPACITY = 1024
+TEXT_CACHE_SIZE = 128
+# Render quality tiers, best first. In play a Governor moves between them to
+# keep frames inside the budget; none of them changes the simulation
+Quality = namedtuple("Quality", ["name", "sparks", "outline", "stars", "effects"])
+QUALITY_TIERS = [
+    # sparks kept per hit, text outline passes, share of stars drawn, muzzle flash and bullet glow
+    Quality("high", 20, 4, 1.0, True),
+    Quality("medium", 12, 4, 0.6, True),
+    Quality("low", 6, 2, 0.3, False),
+    Quality("minimal", 2, 0, 0.0, False),
+]
+quality = QUALITY_TIERS[0]
+
+def set_quality(tier):
+    global quality
+    quality = QUALITY_TIERS[tier]
+
+# Sprite boxes: character anchored at its hitbox midbottom, boss at its rect topleft
+CHARACTER_SPRITE_SIZE = (24, 56)
+CHARACTER_SPRITE_ANCHOR = (12, 50)
+BOSS_SPRITE_ANCHOR = (70, 5)
+
+class Starfield:
+    # Star positions and speeds as NumPy arrays: the whole field moves in one
+    # vectorized step and is stamped with a single blits() call, so it scales
+    # to thousands of stars
+    def __init__(self, count=STAR_COUNT, seed=None):
+        # NumPy seeds must be non-negative; the field is cosmetic, so folding is fine
+        self.rng = np.random.default_rng(None if seed is None else seed % 2 ** 64)
+        self.x = self.rng.integers(0, WIDTH + 1, count)
+        self.y = self.rng.integers(0, HEIGHT + 1, count)
+        self.speed = self.rng.integers(1, 4, count)
+
+    def __len__(self):
+        return len(self.x)
+
+    def update(self):
+        self.y += self.speed
+        wrapped = np.flatnonzero(self.y > HEIGHT)
+        if len(wrapped):
+            self.y[wrapped] = 0
+            self.x[wrapped] = self.rng.integers(0, WIDTH + 1, len(wrapped))
+
+star_image = None
+
+def star_sprite():
+    global star_image
+    if star_image is None:
+        # Solid white on a run-length encoded colorkey: much cheaper to blit
+        # thousands of times than a per-pixel alpha sprite
+        size = STAR_RADIUS * 2 + 1
+        star_image = pygame.Surface((size, size))
+        profiler.count("surfaces")
+        pygame.draw.circle(star_image, WHITE, (STAR_RADIUS, STAR_RADIUS), STAR_RADIUS)
+        star_image.set_colorkey(BLACK, pygame.RLEACCEL)
+    return star_image
+
+def draw_background(surface, stars=()):
     if bg_image:
         surface.blit(bg_image, (0, 0))
     else:
         surface.fill(BG_COLOR)
-        for star in stars:
-            pygame.draw.circle(surface, WHITE, (star["x"], star["y"]), 2)
-            star["y"] += star["speed"]
-            if star["y"] > HEIGHT:
-                star["y"] = 0
-                star["x"] = random.randint(0, WIDTH)
+        draw_stars(surface, stars)
 
-def draw_text(surface, text, font, color, x, y, center=True):
+def draw_stars(surface, stars):
+    # Lower quality draws a share of the stars; all of them keep moving
+    n = int(len(stars) * quality.stars)
+    if not n:
+        return []
+    xs = (stars.x[:n] - STAR_RADIUS).tolist()
+    ys = (stars.y[:n] - STAR_RADIUS).tolist()
+    return surface.blits(zip(repeat(star_sprite()), zip(xs, ys)))
+
+# In pass order: two passes give a drop shadow, four a full outline
+OUTLINE_OFFSETS = [(2, 0), (0, 2), (-2, 0), (0, -2)]
+OUTLINE_PAD = 2
+
+# Fully composited outlined strings, least recently used first
+text_cache = OrderedDict()
+# Per-glyph (outline, fill, advance) for strings assembled from digits
+glyph_cache = {}
+
+def outline_color_for(color):
+    return BLACK if color != BLACK else WHITE
+
+def stamp_outline(target, glyph, x, y, passes=len(OUTLINE_OFFSETS)):
+    for dx, dy in OUTLINE_OFFSETS[:passes]:
+        target.blit(glyph, (x + dx, y + dy))
+
+def render_text(text, font, color):
+    # Rendered with the current quality's outline passes. A cached string
+    # with fewer passes than that is rendered again, so text recovers once
+    # quality does; one with more is kept
+    key = (text, font, color)
+    passes = quality.outline
+    entry = text_cache.get(key)
+    if entry is not None and entry[1] >= passes:
+        text_cache.move_to_end(key)
+        return entry[0]
     txt = font.render(text, True, color)
-    rect = txt.get_rect()
+    shadow = font.render(text, True, outline_color_for(color))
+    profiler.count("text_renders", 2)
+    profiler.count("surfaces")
+    surf = pygame.Surface((txt.get_width() + OUTLINE_PAD * 2, txt.get_height() + OUTLINE_PAD * 2), pygame.SRCALPHA)
+    stamp_outline(surf, shadow, OUTLINE_PAD, OUTLINE_PAD, passes)
+    surf.blit(txt, (OUTLINE_PAD, OUTLINE_PAD))
+    text_cache[key] = (surf, passes)
+    text_cache.move_to_end(key)
+    if len(text_cache) > TEXT_CACHE_SIZE:
+        text_cache.popitem(last=False)
+    return surf
+
+def render_glyph(ch, font, color):
+    key = (ch, font, color)
+    passes = quality.outline
+    glyph = glyph_cache.get(key)
+    if glyph is None or glyph[3] < passes:
+        fill = font.render(ch, True, color)
+        shadow = font.render(ch, True, outline_color_for(color))
+        profiler.count("text_renders", 2)
+        profiler.count("surfaces")
+        outline = pygame.Surface((fill.get_width() + OUTLINE_PAD * 2, fill.get_height() + OUTLINE_PAD * 2), pygame.SRCALPHA)
+        stamp_outline(outline, shadow, OUTLINE_PAD, OUTLINE_PAD, passes)
+        glyph = glyph_cache[key] = (outline, fill, font.size(ch)[0], passes)
+    return glyph
+
+def text_rect(size, x, y, center):
+    # Position the padded surface so the text itself lands where draw_text always put it
+    rect = pygame.Rect((0, 0), size)
     if center:
         rect.center = (x, y)
     else:
-        rect.topleft = (x, y)
-    outline_color = BLACK if color != BLACK else WHITE
-    for dx, dy in [(-2, 0), (2, 0), (0, -2), (0, 2)]:
-        shadow = font.render(text, True, outline_color)
-        surface.blit(shadow, rect.move(dx, dy))
-    surface.blit(txt, rect)
+        rect.topleft = (x - OUTLINE_PAD, y - OUTLINE_PAD)
+    return rect
+
+def draw_text(surface, text, font, color, x, y, center=True):
+    txt = render_text(text, font, color)
+    return surface.blit(txt, text_rect(txt.get_size(), x, y, center))
+
+def draw_counter(surface, label, value, font, color, x, y, center=True):
+    # "label + number" HUD strings: the label comes from the text cache and the
+    # number is stamped from cached digit glyphs, so a changing score never
+    # re-renders the font
+    prefix = render_text(label, font, color)
+    glyphs = [render_glyph(ch, font, color) for ch in str(value)]
+    width = prefix.get_width() + sum(glyph[2] for glyph in glyphs)
+    rect = text_rect((width, prefix.get_height()), x, y, center)
+    surface.blit(prefix, rect)
+    # All outlines first so a glyph's outline never covers its neighbour's fill
+    cursor = rect.x + prefix.get_width() - OUTLINE_PAD * 2
+    positions = []
+    for outline, fill, advance, _ in glyphs:
+        surface.blit(outline, (cursor, rect.y))
+        positions.append(cursor)
+        cursor += advance
+    for (outline, fill, advance, _), gx in zip(glyphs, positions):
+        surface.blit(fill, (gx + OUTLINE_PAD, rect.y + OUTLINE_PAD))
+    return rect
+
+class SpriteAtlas:
+    # Entity sprites baked on first use and shelf-packed into one sheet, so
+    # drawing an entity is a single blit from its area of the sheet
+    def __init__(self, width=512):
+        self.width = width
+        self.sheet = None
+        self.entries = {}  # key -> (area on the sheet, anchor inside the area)
+        self.shelf_x = 0
+        self.shelf_y = 0
+        self.shelf_height = 0
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def allocate(self, w, h):
+        if self.shelf_x + w > self.width:
+            self.shelf_x = 0
+            self.shelf_y += self.shelf_height
+            self.shelf_height = 0
+        area = pygame.Rect(self.shelf_x, self.shelf_y, w, h)
+        self.shelf_x += w
+        self.shelf_height = max(self.shelf_height, h)
+        if self.sheet is None or area.right > self.sheet.get_width() or area.bottom > self.sheet.get_height():
+            height = max(256, area.bottom * 2)
+            sheet = pygame.Surface((self.width, height), pygame.SRCALPHA)
+            profiler.count("surfaces")
+            if self.sheet is not None:
+                sheet.blit(self.sheet, (0, 0))
+            self.sheet = sheet
+        return area
+
+    def bake(self, key, size, anchor, render, *args):
+        # render(surface, anchor_x, anchor_y, *args) draws the sprite around its anchor
+        self.width = max(self.width, size[0])
+        area = self.allocate(*size)
+        self.sheet.set_clip(area)
+        render(self.sheet, area.x + anchor[0], area.y + anchor[1], *args)
+        self.sheet.set_clip(None)
+        self.entries[key] = (area, anchor)
+
+    def blit(self, surface, key, pos):
+        area, anchor = self.entries[key]
+        return surface.blit(self.sheet, (pos[0] - anchor[0], pos[1] - anchor[1]), area)
+
+sprite_atlas = SpriteAtlas()
 
 class Character:
     def __init__(self, level=1):
         # Adjust character size based on difficulty (human proportions)
-        if level == 1:  # Level 1 - Easy: larger hitbox
-            width = 24
-            height = 45
-        elif level == 2:  # Level 2 - Medium: normal size
-            width = 22
-            height = 42
-        elif level == 3:  # Level 3 - Hard: smaller size
-            width = 20
-            height = 40
-        elif level == 4:  # Level 4 - Very Hard: much smaller
-            width = 18
-            height = 37
-        else:  # Level 5 - Boss Fight: smallest hitbox
-            width = 16
-            height = 35
+        width, height = level_tuning(level)["hitbox"]
         
         self.rect = pygame.Rect(WIDTH//2 - width//2, HEIGHT - height - 10, width, height)
         self.speed = 10
@@ -185,186 +697,280 @@ class Character:
         return False
         
     def draw(self, surface):
-        center_x = self.rect.centerx
-        bottom_y = self.rect.bottom
-        
-        # Character proportions
-        head_radius = 8
-        body_width = 12
-        body_height = 16
-        leg_width = 4
-        leg_height = 10
-        arm_width = 3
-        arm_length = 12
-        
-        # Draw legs with simple walking animation
-        import math
-        walk_offset = int(math.sin(self.animation_frame * 0.3) * 2) if hasattr(self, 'animation_frame') else 0
-        
-        left_leg_x = center_x - 4
-        right_leg_x = center_x + 4
-        leg_y = bottom_y - leg_height
-        
-        # Animated leg positions
-        left_leg_y = leg_y + walk_offset
-        right_leg_y = leg_y - walk_offset
-        
-        pygame.draw.rect(surface, PANTS_COLOR, (left_leg_x - leg_width//2, left_leg_y, leg_width, leg_height - abs(walk_offset)))
-        pygame.draw.rect(surface, PANTS_COLOR, (right_leg_x - leg_width//2, right_leg_y, leg_width, leg_height - abs(walk_offset)))
-        
-        # Draw shoes with animation
-        pygame.draw.ellipse(surface, SHOE_COLOR, (left_leg_x - 3, bottom_y - 3 + walk_offset//2, 6, 4))
-        pygame.draw.ellipse(surface, SHOE_COLOR, (right_leg_x - 3, bottom_y - 3 - walk_offset//2, 6, 4))
-        
-        # Draw body (torso)
-        body_y = leg_y - body_height
-        pygame.draw.rect(surface, SHIRT_COLOR, (center_x - body_width//2, body_y, body_width, body_height), border_radius=2)
-        
-        # Draw arms
-        left_arm_x = center_x - body_width//2 - arm_width//2
-        right_arm_x = center_x + body_width//2 + arm_width//2
-        arm_y = body_y + 3
-        
-        # Arms holding gun upward
-        pygame.draw.rect(surface, SKIN_COLOR, (left_arm_x - arm_width//2, arm_y, arm_width, arm_length))
-        pygame.draw.rect(surface, SKIN_COLOR, (right_arm_x - arm_width//2, arm_y, arm_width, arm_length))
-        
-        # Draw head
-        head_y = body_y - head_radius
-        pygame.draw.circle(surface, SKIN_COLOR, (center_x, head_y), head_radius)
-        
-        # Draw hair
-        pygame.draw.arc(surface, HAIR_COLOR, (center_x - head_radius, head_y - head_radius, head_radius * 2, head_radius * 2), 0, 3.14159, 3)
-        
-        # Draw face
-        eye_y = head_y - 2
-        pygame.draw.circle(surface, BLACK, (center_x - 3, eye_y), 1)  # Left eye
-        pygame.draw.circle(surface, BLACK, (center_x + 3, eye_y), 1)  # Right eye
-        
-        # Draw mouth
-        mouth_y = head_y + 2
-        pygame.draw.arc(surface, BLACK, (center_x - 2, mouth_y - 1, 4, 3), 0, 3.14159, 1)
-        
-        # Draw gun
-        gun_x = center_x
-        gun_y = body_y - 5
-        gun_rect = pygame.Rect(gun_x - 2, gun_y - 8, 4, 12)
-        pygame.draw.rect(surface, BLACK, gun_rect)
-        
-        # Gun barrel
-        pygame.draw.rect(surface, (64, 64, 64), (gun_x - 1, gun_y - 10, 2, 4))
-        
-        # Muzzle flash effect when shooting
-        if hasattr(self, 'shoot_timer') and self.shoot_timer < 2:
-            flash_colors = [(255, 255, 0), (255, 200, 0), (255, 150, 0)]
-            for i, color in enumerate(flash_colors):
-                flash_size = (3 - i) * 2
-                pygame.draw.circle(surface, color, (gun_x, gun_y - 10), flash_size)
-
-class Projectile:
-    def __init__(self, x, y, level, angle=0, spread_type="normal"):
-        self.x = x
-        self.y = y
-        self.angle = angle  # Shooting angle in degrees
-        self.spread_type = spread_type
-        self.set_speed(level)
-        self.width = 6
-        self.height = 12
-        self.active = True
-        
+        walk_offset = int(math.sin(self.animation_frame * 0.3) * 2)
+        flash = self.shoot_timer < 2 and quality.effects
+        key = ("character", walk_offset, flash)
+        if key not in sprite_atlas:
+            sprite_atlas.bake(key, CHARACTER_SPRITE_SIZE, CHARACTER_SPRITE_ANCHOR, render_character, walk_offset, flash)
+        return sprite_atlas.blit(surface, key, (self.rect.centerx, self.rect.bottom))
+
+def render_character(surface, center_x, bottom_y, walk_offset, flash):
+    # Character proportions
+    head_radius = 8
+    body_width = 12
+    body_height = 16
+    leg_width = 4
+    leg_height = 10
+    arm_width = 3
+    arm_length = 12
+
+    # Draw legs with simple walking animation
+    left_leg_x = center_x - 4
+    right_leg_x = center_x + 4
+    leg_y = bottom_y - leg_height
+    
+    # Animated leg positions
+    left_leg_y = leg_y + walk_offset
+    right_leg_y = leg_y - walk_offset
+    
+    pygame.draw.rect(surface, PANTS_COLOR, (left_leg_x - leg_width//2, left_leg_y, leg_width, leg_height - abs(walk_offset)))
+    pygame.draw.rect(surface, PANTS_COLOR, (right_leg_x - leg_width//2, right_leg_y, leg_width, leg_height - abs(walk_offset)))
+    
+    # Draw shoes with animation
+    pygame.draw.ellipse(surface, SHOE_COLOR, (left_leg_x - 3, bottom_y - 3 + walk_offset//2, 6, 4))
+    pygame.draw.ellipse(surface, SHOE_COLOR, (right_leg_x - 3, bottom_y - 3 - walk_offset//2, 6, 4))
+    
+    # Draw body (torso)
+    body_y = leg_y - body_height
+    pygame.draw.rect(surface, SHIRT_COLOR, (center_x - body_width//2, body_y, body_width, body_height), border_radius=2)
+    
+    # Draw arms
+    left_arm_x = center_x - body_width//2 - arm_width//2
+    right_arm_x = center_x + body_width//2 + arm_width//2
+    arm_y = body_y + 3
+    
+    # Arms holding gun upward
+    pygame.draw.rect(surface, SKIN_COLOR, (left_arm_x - arm_width//2, arm_y, arm_width, arm_length))
+    pygame.draw.rect(surface, SKIN_COLOR, (right_arm_x - arm_width//2, arm_y, arm_width, arm_length))
+    
+    # Draw head
+    head_y = body_y - head_radius
+    pygame.draw.circle(surface, SKIN_COLOR, (center_x, head_y), head_radius)
+    
+    # Draw hair
+    pygame.draw.arc(surface, HAIR_COLOR, (center_x - head_radius, head_y - head_radius, head_radius * 2, head_radius * 2), 0, 3.14159, 3)
+    
+    # Draw face
+    eye_y = head_y - 2
+    pygame.draw.circle(surface, BLACK, (center_x - 3, eye_y), 1)  # Left eye
+    pygame.draw.circle(surface, BLACK, (center_x + 3, eye_y), 1)  # Right eye
+    
+    # Draw mouth
+    mouth_y = head_y + 2
+    pygame.draw.arc(surface, BLACK, (center_x - 2, mouth_y - 1, 4, 3), 0, 3.14159, 1)
+    
+    # Draw gun
+    gun_x = center_x
+    gun_y = body_y - 5
+    gun_rect = pygame.Rect(gun_x - 2, gun_y - 8, 4, 12)
+    pygame.draw.rect(surface, BLACK, gun_rect)
+    
+    # Gun barrel
+    pygame.draw.rect(surface, (64, 64, 64), (gun_x - 1, gun_y - 10, 2, 4))
+    
+    # Muzzle flash effect when shooting
+    if flash:
+        flash_colors = [(255, 255, 0), (255, 200, 0), (255, 150, 0)]
+        for i, color in enumerate(flash_colors):
+            flash_size = (3 - i) * 2
+            pygame.draw.circle(surface, color, (gun_x, gun_y - 10), flash_size)
+
+def projectile_speed(level):
+    # Projectile speed based on difficulty
+    return level_tuning(level)["projectile_speed"]
+
+class ArrayPool:
+    # Entities kept as parallel NumPy arrays, one per name in `arrays`, with
+    # the live ones packed in [0, count)
+    arrays = ()
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def grow(self):
+        capacity = len(getattr(self, self.arrays[0])) * 2
+        for name in self.arrays:
+            setattr(self, name, np.resize(getattr(self, name), capacity))
+
+    def copy(self):
+        clone = object.__new__(type(self))
+        clone.count = self.count
+        for name in self.arrays:
+            setattr(clone, name, getattr(self, name).copy())
+        return clone
+
+class ProjectileStore(ArrayPool):
+    # Player shots kept as parallel NumPy arrays so the whole volley moves,
+    # culls and collides in one batch; live shots are packed in [0, count)
+    # in firing order
+    width = 6
+    height = 12
+    arrays = ("x", "y", "dx", "dy", "active")
+
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.dx = np.zeros(capacity)
+        self.dy = np.zeros(capacity)
+        self.active = np.zeros(capacity, dtype=bool)
+
+    def spawn(self, x, y, level, angle=0):
+        if self.count == len(self.x):
+            self.grow()
+        speed = projectile_speed(level)
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
         # Calculate velocity components based on angle
-        import math
-        angle_rad = math.radians(angle)
-        self.dx = math.sin(angle_rad) * self.speed * 0.3  # Horizontal component
-        self.dy = -self.speed  # Vertical component (always upward)
-        
-    def set_speed(self, level):
-        # Projectile speed based on difficulty
-        if level == 1:  # Easy - slower projectiles, easier to aim
-            self.speed = 10
-        elif level == 2:  # Medium - normal speed
-            self.speed = 14
-        else:  # Hard - faster projectiles
-            self.speed = 18
-            
-    def update(self, bricks, boss=None):
-        # Update position with directional movement
-        self.x += self.dx
-        self.y += self.dy
+        self.dx[i] = math.sin(math.radians(angle)) * speed * 0.3  # Horizontal component
+        self.dy[i] = -speed  # Vertical component (always upward)
+        self.active[i] = True
+        self.count += 1
+
+    def update(self, state):
+        bricks = state.bricks
+        boss = state.boss
+        n = self.count
         score = 0
         cleared = False
-        
-        # Remove if off screen (any direction)
-        if (self.y < -self.height or self.x < -self.width or 
-            self.x > WIDTH + self.width):
-            self.active = False
+        if n == 0:
             return score, cleared
-            
-        # Check brick collisions
-        projectile_rect = pygame.Rect(self.x - self.width//2, self.y - self.height//2, self.width, self.height)
-        hit_index = self.collide_bricks(bricks, projectile_rect)
-        if hit_index is not None:
-            brick = bricks[hit_index]
-            brick["hp"] -= 1
-            self.active = False
-            score += 10
-            if brickhit_sound:
-                brickhit_sound.play()
-            if brick["hp"] <= 0:
-                bricks.pop(hit_index)
-                spawn_powerup(brick["rect"].centerx, brick["rect"].centery, LEVEL)
-                make_sparks(brick["rect"].centerx, brick["rect"].centery)
-            if not bricks:
-                cleared = True
-                
-        # Check boss collision
-        if boss and boss["rect"].colliderect(projectile_rect):
-            boss["hp"] -= 1
-            self.active = False
-            score += 50
-            if boss_hit_sound:
-                boss_hit_sound.play()
-            if boss["hp"] <= 0:
-                cleared = True
-                
+        x = self.x[:n]
+        y = self.y[:n]
+        active = self.active[:n]
+        # Projectile rects before the move, truncated the same way pygame.Rect truncates floats
+        left0 = np.trunc(x - self.width // 2).astype(np.int64)
+        top0 = np.trunc(y - self.height // 2).astype(np.int64)
+        # Update position with directional movement
+        x += self.dx[:n]
+        y += self.dy[:n]
+
+        # Remove if off screen (any direction)
+        active &= ~((y < -self.height) | (x < -self.width) | (x > WIDTH + self.width))
+
+        # Rects after the move; a shot is tested along the whole segment
+        # between the two, so fast shots cannot skip over a thin brick
+        left = np.trunc(x - self.width // 2).astype(np.int64)
+        top = np.trunc(y - self.height // 2).astype(np.int64)
+        step_x = left - left0
+        step_y = top - top0
+        # Broad phase on the box swept by each shot
+        swept_left = np.minimum(left0, left)
+        swept_top = np.minimum(top0, top)
+        swept_right = np.maximum(left0, left) + self.width
+        swept_bottom = np.maximum(top0, top) + self.height
+
+        hits = active & bricks.overlaps_any(swept_left, swept_top, swept_right, swept_bottom)
+        if boss:
+            b = boss.rect
+            hits |= active & ((swept_left < b.right) & (swept_right > b.left) &
+                              (swept_top < b.bottom) & (swept_bottom > b.top))
+
+        if hits.any():
+            bricks.own()  # before sweep() hands out bricks to change
+        for i in np.flatnonzero(hits):
+            start = pygame.Rect(int(left0[i]), int(top0[i]), self.width, self.height)
+            dx, dy = int(step_x[i]), int(step_y[i])
+            # Only the first thing along the segment is hit
+            brick, t = bricks.sweep(start, dx, dy)
+            if boss:
+                boss_t = sweep_time(start, dx, dy, boss.rect)
+                if boss_t is not None and (t is None or boss_t < t):
+                    brick = None
+                    t = boss_t
+            if t is None:
+                continue
+            active[i] = False
+            if brick is not None:
+                # Brick hit
+                bricks.damage(brick)
+                score += 10
+                state.emit("brick_hit")
+                if brick.hp <= 0:
+                    bricks.remove(brick)
+                    spawn_powerup(state, brick.rect.centerx, brick.rect.centery)
+                    make_sparks(state, brick.rect.centerx, brick.rect.centery)
+                if not bricks:
+                    cleared = True
+            else:
+                # Boss hit
+                boss.hp -= 1
+                score += 50
+                state.emit("boss_hit")
+                if boss.hp <= 0:
+                    cleared = True
+            if cleared:
+                break
+
+        # Compact surviving shots to the front, keeping firing order
+        keep = np.flatnonzero(active)
+        self.count = len(keep)
+        for arr in (self.x, self.y, self.dx, self.dy):
+            arr[:self.count] = arr[keep]
+        self.active[:self.count] = True
         return score, cleared
-        
-    def collide_bricks(self, bricks, projectile_rect):
-        for i, brick in enumerate(bricks):
-            if brick["rect"].colliderect(projectile_rect):
-                return i
-        return None
-        
-    def draw(self, surface):
-        # Draw projectile as a glowing bullet
-        pygame.draw.ellipse(surface, PROJECTILE_COLOR, 
-                          (self.x - self.width//2, self.y - self.height//2, self.width, self.height))
-        # Add glow effect
-        pygame.draw.ellipse(surface, WHITE, 
-                          (self.x - self.width//4, self.y - self.height//4, self.width//2, self.height//2))
 
-# Global projectiles list
-projectiles = []
+# glow -> bullet sprite
+bullet_sprites = {}
+
+def projectile_sprite(glow=True):
+    sprite = bullet_sprites.get(glow)
+    if sprite is None:
+        width, height = ProjectileStore.width, ProjectileStore.height
+        if glow:
+            # Draw projectile as a glowing bullet
+            sprite = pygame.Surface((width, height), pygame.SRCALPHA)
+            pygame.draw.ellipse(sprite, PROJECTILE_COLOR, (0, 0, width, height))
+            # Add glow effect
+            pygame.draw.ellipse(sprite, WHITE, (width // 2 - width // 4, height // 2 - height // 4, width // 2, height // 2))
+        else:
+            # Plain bullet on an RLE colorkey, cheaper to blit than per-pixel alpha
+            sprite = pygame.Surface((width, height))
+            pygame.draw.ellipse(sprite, PROJECTILE_COLOR, (0, 0, width, height))
+            sprite.set_colorkey(BLACK, pygame.RLEACCEL)
+        profiler.count("surfaces")
+        bullet_sprites[glow] = sprite
+    return sprite
+
+def draw_player_projectiles(surface, projectiles):
+    n = projectiles.count
+    if n == 0:
+        return []
+    xs = (projectiles.x[:n] - projectiles.width // 2).astype(int).tolist()
+    ys = (projectiles.y[:n] - projectiles.height // 2).astype(int).tolist()
+    sprite = projectile_sprite(quality.effects)
+    return surface.blits([(sprite, pos) for pos in zip(xs, ys)])
 
-def spawn_powerup(x, y, level=1):
+POWERUP_TYPES = ["expand", "shrink", "slow", "fast", "score"]
+
+class Powerup:
+    __slots__ = ("rect", "type", "dx", "dy")
+
+    def __init__(self, rect, p_type, dx, dy):
+        self.rect = rect
+        self.type = p_type
+        self.dx = dx
+        self.dy = dy
+
+def spawn_powerup(state, x, y):
     # Adjust powerup spawn rate based on difficulty
-    if level == 1:  # Easy - more powerups
-        spawn_chance = 0.4
-    elif level == 2:  # Medium - normal powerups
-        spawn_chance = 0.25
-    else:  # Hard - fewer powerups
-        spawn_chance = 0.15
+    spawn_chance = level_tuning(state.level)["powerup_chance"]
     
-    if random.random() < spawn_chance:
-        p_type = random.choice(["expand", "shrink", "slow", "fast", "score"])
+    rng = state.rng
+    if rng.random() < spawn_chance:
+        p_type = rng.choice(POWERUP_TYPES)
         rect = pygame.Rect(x-10, y-10, 20, 20)
         # Slower fall speed and slight horizontal drift for better catchability
-        dx = random.uniform(-1, 1)  # Small horizontal drift
-        dy = random.uniform(1.5, 2.5)  # Slower, variable fall speed
-        powerups.append({"rect": rect, "type": p_type, "dx": dx, "dy": dy})
+        dx = rng.uniform(-1, 1)  # Small horizontal drift
+        dy = rng.uniform(1.5, 2.5)  # Slower, variable fall speed
+        state.powerups.append(Powerup(rect, p_type, dx, dy))
 
-def apply_powerup(character, p_type):
-    global score
+def apply_powerup(state, p_type):
+    character = state.character
     # Set firing multiplier based on powerup type/color
     if p_type == "expand":
         character.rect.width = min(character.rect.width + 30, 180)
@@ -380,401 +986,947 @@ def apply_powerup(character, p_type):
         # Increase movement speed
         character.speed = min(character.speed + 3, 18)
     elif p_type == "score":
-        score += 100
-    if powerup_sound:
-        powerup_sound.play()
-
-def make_sparks(x, y):
-    for _ in range(20):
-        sparks.append({
-            "x": x, "y": y,
-            "dx": random.uniform(-4, 4), "dy": random.uniform(0.5, 1.5),
-            "life": random.randint(15, 25), "color": random.choice(BRICK_COLORS)
-        })
-
-def draw_sparks(surface):
-    for spark in sparks[:]:
-        spark["x"] += spark["dx"]
-        spark["y"] += spark["dy"]
-        spark["dy"] += 0.05
-        spark["life"] -= 1
-        if spark["life"] <= 0:
-            sparks.remove(spark)
-            continue
-        alpha = max(50, min(255, spark["life"] * 12))
-        radius = max(1, spark["life"] // 3)
-        particle_surface = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
-        r, g, b = spark.get("color", (255, 255, 100))
-        pygame.draw.circle(particle_surface, (r, g, b, alpha), (radius, radius), radius)
-        surface.blit(particle_surface, (spark["x"]-radius, spark["y"]-radius))
+        state.score += 100
+    state.emit("powerup")
+
+def update_powerups(state):
+    character = state.character
+    powerups = state.powerups
+    for p in powerups[:]:
+        # Update powerup position with both horizontal and vertical movement
+        p.rect.x += p.dx
+        p.rect.y += p.dy
+        
+        # Keep powerups within screen bounds horizontally
+        if p.rect.left < 0 or p.rect.right > WIDTH:
+            p.dx *= -0.5  # Bounce back with reduced speed
+            p.rect.x = max(0, min(WIDTH - p.rect.width, p.rect.x))
+        
+        if p.rect.colliderect(character.rect):
+            apply_powerup(state, p.type)
+            powerups.remove(p)
+        elif p.rect.top > HEIGHT:
+            powerups.remove(p)
+
+class SparkPool(ArrayPool):
+    # Fixed-capacity particle pool: live sparks are packed in [0, count) of
+    # preallocated arrays, and each (color, radius, alpha) sprite is rendered
+    # once and reused. Radius and alpha both follow life, so there are only a
+    # few dozen sprites per color
+    arrays = ("x", "y", "dx", "dy", "life", "color")
+
+    def __init__(self, capacity=SPARK_CAPACITY):
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.dx = np.zeros(capacity)
+        self.dy = np.zeros(capacity)
+        self.life = np.zeros(capacity, dtype=np.int32)
+        self.color = np.zeros(capacity, dtype=np.int32)  # index into BRICK_COLORS
+
+    def emit(self, x, y, rng, amount=20, keep=None):
+        # Only the first `keep` sparks are stored, and sparks past capacity are
+        # dropped; they are purely cosmetic. All `amount` are still drawn from
+        # rng, so the game's random stream never depends on quality or load
+        keep = amount if keep is None else keep
+        for n in range(amount):
+            dx = rng.uniform(-4, 4)
+            dy = rng.uniform(0.5, 1.5)
+            life = rng.randint(15, 25)
+            color = rng.randrange(len(BRICK_COLORS))
+            if n >= keep or self.count == len(self.x):
+                continue
+            i = self.count
+            self.x[i] = x
+            self.y[i] = y
+            self.dx[i] = dx
+            self.dy[i] = dy
+            self.life[i] = life
+            self.color[i] = color
+            self.count += 1
+
+    def update(self):
+        n = self.count
+        if n == 0:
+            return
+        self.x[:n] += self.dx[:n]
+        self.y[:n] += self.dy[:n]
+        self.dy[:n] += 0.05
+        self.life[:n] -= 1
+        keep = np.flatnonzero(self.life[:n] > 0)
+        self.count = len(keep)
+        for arr in (self.x, self.y, self.dx, self.dy, self.life, self.color):
+            arr[:self.count] = arr[keep]
+
+# (color, radius, alpha) -> pre-rendered spark
+spark_sprites = {}
+
+def spark_sprite(color, radius, alpha):
+    key = (color, radius, alpha)
+    surf = spark_sprites.get(key)
+    if surf is None:
+        surf = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
+        profiler.count("surfaces")
+        r, g, b = BRICK_COLORS[color]
+        pygame.draw.circle(surf, (r, g, b, alpha), (radius, radius), radius)
+        spark_sprites[key] = surf
+    return surf
+
+def make_sparks(state, x, y):
+    state.sparks.emit(x, y, state.rng, keep=quality.sparks)
+
+def draw_sparks(surface, sparks):
+    n = sparks.count
+    if n == 0:
+        return []
+    life = sparks.life[:n]
+    alpha = np.clip(life * 12, 50, 255)
+    radius = np.maximum(1, life // 3)
+    xs = (sparks.x[:n] - radius).astype(int).tolist()
+    ys = (sparks.y[:n] - radius).astype(int).tolist()
+    batch = [(spark_sprite(c, r, a), (px, py)) for c, r, a, px, py
+             in zip(sparks.color[:n].tolist(), radius.tolist(), alpha.tolist(), xs, ys)]
+    return surface.blits(batch)
+
+def brick_rect(row, col):
+    return pygame.Rect(col * BRICK_WIDTH + 2, row * BRICK_HEIGHT + 2 + BRICK_TOP, BRICK_WIDTH - 4, BRICK_HEIGHT - 4)
 
 def create_bricks(level):
-    bricks = []
-    if level == 1:  # Level 1 - Easy: 3 rows, all 1-hit bricks
-        rows = 3
-        for row in range(rows):
-            for col in range(BRICK_COLS):
-                x = col * BRICK_WIDTH + 2
-                y = row * BRICK_HEIGHT + 2 + 60
-                rect = pygame.Rect(x, y, BRICK_WIDTH - 4, BRICK_HEIGHT - 4)
-                bricks.append({"rect": rect, "hp": 1})
-    elif level == 2:  # Level 2 - Medium: 4 rows, some 2-hit bricks
-        rows = 4
-        for row in range(rows):
-            for col in range(BRICK_COLS):
-                x = col * BRICK_WIDTH + 2
-                y = row * BRICK_HEIGHT + 2 + 60
-                rect = pygame.Rect(x, y, BRICK_WIDTH - 4, BRICK_HEIGHT - 4)
-                hp = 2 if row < 2 else 1
-                bricks.append({"rect": rect, "hp": hp})
-    elif level == 3:  # Level 3 - Hard: 5 rows, more 2-hit bricks
-        rows = 5
-        for row in range(rows):
-            for col in range(BRICK_COLS):
-                x = col * BRICK_WIDTH + 2
-                y = row * BRICK_HEIGHT + 2 + 60
-                rect = pygame.Rect(x, y, BRICK_WIDTH - 4, BRICK_HEIGHT - 4)
-                hp = 2 if row < 3 else 1
-                bricks.append({"rect": rect, "hp": hp})
-    elif level == 4:  # Level 4 - Very Hard: 6 rows, many 3-hit bricks
-        rows = 6
-    for row in range(rows):
-        for col in range(BRICK_COLS):
-            x = col * BRICK_WIDTH + 2
-            y = row * BRICK_HEIGHT + 2 + 60
-            rect = pygame.Rect(x, y, BRICK_WIDTH - 4, BRICK_HEIGHT - 4)
-            if row < 2:
-                hp = 3  # Top 2 rows are 3-hit bricks
-            elif row < 4:
-                hp = 2  # Next 2 rows are 2-hit bricks
-            else:
-                hp = 1  # Bottom rows are 1-hit bricks
-            bricks.append({"rect": rect, "hp": hp})
-    else:
-        # Level 5 goes to boss fight
-        return bricks
+    # The level's compiled hp grid, one brick per non-empty cell; boss
+    # levels have none
+    grid = LEVELS[level - 1].grid
+    bricks = BrickField()
+    rows, cols = np.nonzero(grid)
+    for row, col in zip(rows.tolist(), cols.tolist()):
+        bricks.add(Brick(brick_rect(row, col), int(grid[row, col])))
     return bricks
 
-def draw_bricks(surface, bricks):
-    for i, brick in enumerate(bricks):
-        # Base color from brick colors array
-        base_color = BRICK_COLORS[i // BRICK_COLS % len(BRICK_COLORS)]
-        
-        # Modify color based on HP (darker = stronger)
-        hp = brick["hp"]
-        if hp == 1:
-            color = base_color  # Normal brightness
-        elif hp == 2:
-            # Darker for 2-hit bricks
-            color = tuple(max(0, c - 50) for c in base_color)
-        else:  # hp >= 3
-            # Much darker for 3+ hit bricks
-            color = tuple(max(0, c - 100) for c in base_color)
-            
-        pygame.draw.rect(surface, color, brick["rect"], border_radius=6)
-        
-        # Draw HP indicator
-        if hp > 1:
-            center_x = brick["rect"].centerx
-            center_y = brick["rect"].centery
-            draw_text(surface, str(hp), small_font, WHITE, center_x, center_y)
+def scroll_bricks(state):
+    # Endless mode: every brick moves down a row, bricks leaving the window
+    # are dropped and the stream's next row enters at the top
+    bricks = list(state.bricks)
+    field = state.bricks
+    field.clear()
+    bottom = BRICK_TOP + ENDLESS_WINDOW * BRICK_HEIGHT
+    for brick in bricks:
+        # New bricks: the old ones may be shared with a clone
+        rect = brick.rect.move(0, BRICK_HEIGHT)
+        if rect.bottom <= bottom:
+            field.add(Brick(rect, brick.hp))
+    for col, hp in enumerate(next(state.rows)):
+        if hp:
+            field.add(Brick(brick_rect(0, col), hp))
+
+def brick_color(row, hp):
+    # Base color is fixed per grid row, darker = stronger
+    shades = BRICK_SHADES[row % len(BRICK_SHADES)]
+    return shades[min(hp, 3) - 1]
+
+def draw_brick(surface, brick, dy=0):
+    rect = brick.rect.move(0, dy)
+    hp = brick.hp
+    row = (brick.rect.top - BRICK_TOP) // BRICK_HEIGHT
+    pygame.draw.rect(surface, brick_color(row, hp), rect, border_radius=6)
+
+    # Draw HP indicator
+    if hp > 1:
+        draw_text(surface, str(hp), small_font, WHITE, rect.centerx, rect.centery)
+
+class BrickLayer:
+    # The brick field drawn once into a persistent surface; each frame only the
+    # cells the field marked dirty are redrawn, then the layer is one blit.
+    # Refreshing clears the field's dirty cells, so a field is drawn through
+    # one layer at a time
+    def __init__(self):
+        self.field = None
+        self.surface = None
+
+    def render_cell(self, field, col, row):
+        if not (0 <= col < BRICK_COLS and 0 <= row < BRICK_GRID_ROWS):
+            return
+        cell_rect = pygame.Rect(col * BRICK_WIDTH, row * BRICK_HEIGHT, BRICK_WIDTH, BRICK_HEIGHT)
+        self.surface.fill((0, 0, 0, 0), cell_rect)
+        self.surface.set_clip(cell_rect)
+        for brick in field.cells.get((col, row), ()):
+            draw_brick(self.surface, brick, -BRICK_TOP)
+        self.surface.set_clip(None)
+
+    def refresh(self, field):
+        # Bring the layer up to date with the field; returns the screen rects
+        # that changed, or None after a full rebuild
+        if self.surface is None:
+            self.surface = pygame.Surface((WIDTH, BRICK_GRID_ROWS * BRICK_HEIGHT), pygame.SRCALPHA)
+            profiler.count("surfaces")
+        changed = None
+        if field is not self.field or field.dirty_all:
+            self.field = field
+            self.surface.fill((0, 0, 0, 0))
+            for brick in field:
+                if id(brick) not in field.offgrid:
+                    draw_brick(self.surface, brick, -BRICK_TOP)
+        else:
+            changed = []
+            for col, row in field.dirty:
+                self.render_cell(field, col, row)
+                changed.append(pygame.Rect(col * BRICK_WIDTH, BRICK_TOP + row * BRICK_HEIGHT, BRICK_WIDTH, BRICK_HEIGHT))
+        field.dirty.clear()
+        field.dirty_all = False
+        return changed
+
+    def blit(self, surface, area=None):
+        if area is None:
+            # Only blit the rows that currently hold bricks
+            rows = np.flatnonzero(self.field.occupancy.any(axis=1))
+            if len(rows):
+                area = pygame.Rect(0, rows[0] * BRICK_HEIGHT, WIDTH, (rows[-1] - rows[0] + 1) * BRICK_HEIGHT)
+                surface.blit(self.surface, (0, BRICK_TOP + area.y), area)
+            for brick in self.field.offgrid.values():
+                draw_brick(surface, brick)
+        else:
+            surface.blit(self.surface, area.topleft, area.move(0, -BRICK_TOP))
+            if self.field.offgrid:
+                surface.set_clip(area)
+                for brick in self.field.offgrid.values():
+                    draw_brick(surface, brick)
+                surface.set_clip(None)
+
+    def draw(self, surface, field):
+        self.refresh(field)
+        self.blit(surface)
+
+# For callers without a Renderer; each Renderer keeps its own layer, since a
+# layer shared between fields would be rebuilt on every switch
+brick_layer = BrickLayer()
+
+def draw_bricks(surface, bricks, layer=brick_layer):
+    layer.draw(surface, bricks)
+
+class Boss:
+    __slots__ = ("rect", "hp", "dir", "phase", "max_hp")
+
+    def __init__(self, rect, hp):
+        self.rect = rect
+        self.hp = hp
+        self.dir = 4
+        self.phase = 1
+        self.max_hp = hp
 
 def create_boss():
     rect = pygame.Rect(WIDTH//2 - 150, 100, 300, 80)
     # Boss fight for Level 5 with full BOSS_HP
-    return {"rect": rect, "hp": BOSS_HP, "dir": 4, "phase": 1, "max_hp": BOSS_HP}
+    return Boss(rect, BOSS_HP)
+
+def boss_sprite(size):
+    key = ("boss", size)
+    if key not in sprite_atlas:
+        sprite_atlas.bake(key, (size[0] + 160, size[1] + 35), BOSS_SPRITE_ANCHOR, render_boss, size)
+    return key
 
 def draw_boss(surface, boss):
     if boss:
-        rect = boss["rect"]
-        center_x = rect.centerx
-        center_y = rect.centery
-        
-        # Dinosaur proportions
-        head_width = 80
-        head_height = 60
-        body_width = rect.width
-        body_height = rect.height
-        
-        # Draw dinosaur body (main torso)
-        pygame.draw.ellipse(surface, DINO_BODY_COLOR, rect, width=0)
-        
-        # Draw belly
-        belly_rect = pygame.Rect(rect.left + 20, rect.top + 15, rect.width - 40, rect.height - 25)
-        pygame.draw.ellipse(surface, DINO_BELLY_COLOR, belly_rect, width=0)
-        
-        # Draw dinosaur head (left side)
-        head_x = rect.left - 40
-        head_y = rect.top + 10
-        head_rect = pygame.Rect(head_x, head_y, head_width, head_height)
-        pygame.draw.ellipse(surface, DINO_BODY_COLOR, head_rect, width=0)
-        
-        # Draw dinosaur snout
-        snout_rect = pygame.Rect(head_x - 25, head_y + 20, 30, 20)
-        pygame.draw.ellipse(surface, DINO_BODY_COLOR, snout_rect, width=0)
-        
-        # Draw dinosaur eye
-        eye_x = head_x + 15
-        eye_y = head_y + 15
-        pygame.draw.circle(surface, WHITE, (eye_x, eye_y), 8)
-        pygame.draw.circle(surface, DINO_EYE_COLOR, (eye_x, eye_y), 5)
-        
-        # Draw teeth
-        for i in range(3):
-            tooth_x = head_x - 20 + i * 8
-            tooth_y = head_y + 35
-            pygame.draw.polygon(surface, DINO_TEETH_COLOR, 
-                              [(tooth_x, tooth_y), (tooth_x + 3, tooth_y - 8), (tooth_x + 6, tooth_y)])
-        
-        # Draw dinosaur tail (right side)
-        tail_points = [
-            (rect.right, rect.centery - 10),
-            (rect.right + 60, rect.centery - 5),
-            (rect.right + 80, rect.centery + 10),
-            (rect.right + 60, rect.centery + 15),
-            (rect.right, rect.centery + 10)
-        ]
-        pygame.draw.polygon(surface, DINO_BODY_COLOR, tail_points)
-        
-        # Draw legs
-        leg_width = 15
-        leg_height = 25
-        leg_y = rect.bottom
-        
-        # Front legs
-        front_leg1_x = rect.left + 30
-        front_leg2_x = rect.left + 60
-        pygame.draw.rect(surface, DINO_BODY_COLOR, (front_leg1_x, leg_y, leg_width, leg_height))
-        pygame.draw.rect(surface, DINO_BODY_COLOR, (front_leg2_x, leg_y, leg_width, leg_height))
-        
-        # Back legs (bigger)
-        back_leg1_x = rect.right - 60
-        back_leg2_x = rect.right - 30
-        pygame.draw.rect(surface, DINO_BODY_COLOR, (back_leg1_x, leg_y, leg_width + 5, leg_height))
-        pygame.draw.rect(surface, DINO_BODY_COLOR, (back_leg2_x, leg_y, leg_width + 5, leg_height))
-        
-        # Draw spots on dinosaur
-        spots = [
-            (rect.left + 50, rect.top + 20),
-            (rect.left + 120, rect.top + 30),
-            (rect.left + 200, rect.top + 25),
-            (rect.left + 80, rect.top + 50),
-            (rect.left + 180, rect.top + 55)
-        ]
-        for spot_x, spot_y in spots:
-            if rect.left <= spot_x <= rect.right and rect.top <= spot_y <= rect.bottom:
-                pygame.draw.circle(surface, DINO_SPOTS_COLOR, (spot_x, spot_y), 8)
-        
+        rect = boss.rect
+        sprite_area = sprite_atlas.blit(surface, boss_sprite(rect.size), rect.topleft)
+
         # Draw HP bar
-        draw_text(surface, f"Dinosaur Boss HP: {boss['hp']}", small_font, WHITE, WIDTH//2, rect.bottom + 40)
+        hp_area = draw_counter(surface, "Dinosaur Boss HP: ", boss.hp, small_font, WHITE, WIDTH//2, rect.bottom + 40)
+        return sprite_area.union(hp_area)
+
+def render_boss(surface, x, y, size):
+    rect = pygame.Rect((x, y), size)
+    center_x = rect.centerx
+    center_y = rect.centery
+    
+    # Dinosaur proportions
+    head_width = 80
+    head_height = 60
+    body_width = rect.width
+    body_height = rect.height
+    
+    # Draw dinosaur body (main torso)
+    pygame.draw.ellipse(surface, DINO_BODY_COLOR, rect, width=0)
+    
+    # Draw belly
+    belly_rect = pygame.Rect(rect.left + 20, rect.top + 15, rect.width - 40, rect.height - 25)
+    pygame.draw.ellipse(surface, DINO_BELLY_COLOR, belly_rect, width=0)
+    
+    # Draw dinosaur head (left side)
+    head_x = rect.left - 40
+    head_y = rect.top + 10
+    head_rect = pygame.Rect(head_x, head_y, head_width, head_height)
+    pygame.draw.ellipse(surface, DINO_BODY_COLOR, head_rect, width=0)
+    
+    # Draw dinosaur snout
+    snout_rect = pygame.Rect(head_x - 25, head_y + 20, 30, 20)
+    pygame.draw.ellipse(surface, DINO_BODY_COLOR, snout_rect, width=0)
+    
+    # Draw dinosaur eye
+    eye_x = head_x + 15
+    eye_y = head_y + 15
+    pygame.draw.circle(surface, WHITE, (eye_x, eye_y), 8)
+    pygame.draw.circle(surface, DINO_EYE_COLOR, (eye_x, eye_y), 5)
+    
+    # Draw teeth
+    for i in range(3):
+        tooth_x = head_x - 20 + i * 8
+        tooth_y = head_y + 35
+        pygame.draw.polygon(surface, DINO_TEETH_COLOR, 
+                          [(tooth_x, tooth_y), (tooth_x + 3, tooth_y - 8), (tooth_x + 6, tooth_y)])
+    
+    # Draw dinosaur tail (right side)
+    tail_points = [
+        (rect.right, rect.centery - 10),
+        (rect.right + 60, rect.centery - 5),
+        (rect.right + 80, rect.centery + 10),
+        (rect.right + 60, rect.centery + 15),
+        (rect.right, rect.centery + 10)
+    ]
+    pygame.draw.polygon(surface, DINO_BODY_COLOR, tail_points)
+    
+    # Draw legs
+    leg_width = 15
+    leg_height = 25
+    leg_y = rect.bottom
+    
+    # Front legs
+    front_leg1_x = rect.left + 30
+    front_leg2_x = rect.left + 60
+    pygame.draw.rect(surface, DINO_BODY_COLOR, (front_leg1_x, leg_y, leg_width, leg_height))
+    pygame.draw.rect(surface, DINO_BODY_COLOR, (front_leg2_x, leg_y, leg_width, leg_height))
+    
+    # Back legs (bigger)
+    back_leg1_x = rect.right - 60
+    back_leg2_x = rect.right - 30
+    pygame.draw.rect(surface, DINO_BODY_COLOR, (back_leg1_x, leg_y, leg_width + 5, leg_height))
+    pygame.draw.rect(surface, DINO_BODY_COLOR, (back_leg2_x, leg_y, leg_width + 5, leg_height))
+    
+    # Draw spots on dinosaur
+    spots = [
+        (rect.left + 50, rect.top + 20),
+        (rect.left + 120, rect.top + 30),
+        (rect.left + 200, rect.top + 25),
+        (rect.left + 80, rect.top + 50),
+        (rect.left + 180, rect.top + 55)
+    ]
+    for spot_x, spot_y in spots:
+        if rect.left <= spot_x <= rect.right and rect.top <= spot_y <= rect.bottom:
+            pygame.draw.circle(surface, DINO_SPOTS_COLOR, (spot_x, spot_y), 8)
 
-def update_boss(boss):
-    max_hp = boss["max_hp"]
+def update_boss(state):
+    boss = state.boss
+    boss_projectiles = state.boss_projectiles
+    max_hp = boss.max_hp
     
     # Phase changes based on HP percentage
-    if boss["hp"] <= max_hp * 0.25 and boss["phase"] < 3:
-        boss["phase"] = 3
-        boss["dir"] = 8  # Faster movement in final phase
-    elif boss["hp"] <= max_hp * 0.5 and boss["phase"] < 2:
-        boss["phase"] = 2
-        boss["dir"] = 6  # Increased speed in phase 2
+    if boss.hp <= max_hp * 0.25 and boss.phase < 3:
+        boss.phase = 3
+        boss.dir = 8  # Faster movement in final phase
+    elif boss.hp <= max_hp * 0.5 and boss.phase < 2:
+        boss.phase = 2
+        boss.dir = 6  # Increased speed in phase 2
 
     # Move boss
-    boss["rect"].x += boss["dir"]
-    if boss["rect"].left <= 0 or boss["rect"].right >= WIDTH:
-        boss["dir"] *= -1
+    boss.rect.x += boss.dir
+    if boss.rect.left <= 0 or boss.rect.right >= WIDTH:
+        boss.dir *= -1
 
     # Increased fire rate per phase for hard difficulty
-    if boss["phase"] == 1:
-        fire_rate = 0.03
-    elif boss["phase"] == 2:
-        fire_rate = 0.06
-    else:
-        fire_rate = 0.1  # Much more aggressive in final phase
+    fire_rate = BOSS_FIRE_RATES[boss.phase]
 
-    if random.random() < fire_rate:
+    rng = state.rng
+    if rng.random() < fire_rate:
         # Multiple projectiles in later phases
-        if boss["phase"] == 3:
+        if boss.phase == 3:
             # Fire 3 projectiles in final phase
             for offset in [-20, 0, 20]:
-                proj = pygame.Rect(boss["rect"].centerx + offset - 5, boss["rect"].bottom, 10, 20)
-                boss_projectiles.append(proj)
-        elif boss["phase"] == 2:
+                boss_projectiles.spawn(boss.rect.centerx + offset - 5, boss.rect.bottom)
+        elif boss.phase == 2:
             # Fire 2 projectiles in phase 2
             for offset in [-10, 10]:
-                proj = pygame.Rect(boss["rect"].centerx + offset - 5, boss["rect"].bottom, 10, 20)
-                boss_projectiles.append(proj)
+                boss_projectiles.spawn(boss.rect.centerx + offset - 5, boss.rect.bottom)
         else:
             # Single projectile in phase 1
-            proj = pygame.Rect(boss["rect"].centerx - 5, boss["rect"].bottom, 10, 20)
-            boss_projectiles.append(proj)
+            boss_projectiles.spawn(boss.rect.centerx - 5, boss.rect.bottom)
 
     # More frequent shield spawning in final phase
-    if boss["phase"] == 3 and random.random() < 0.02:
-        shield_x = random.randint(0, BRICK_COLS - 1) * BRICK_WIDTH + 2
-        shield_y = random.randint(2, 4) * BRICK_HEIGHT + 60
+    if boss.phase == 3 and rng.random() < BOSS_SHIELD_CHANCE:
+        shield_x = rng.randint(0, BRICK_COLS - 1) * BRICK_WIDTH + 2
+        shield_y = rng.randint(2, 4) * BRICK_HEIGHT + BRICK_TOP
         shield_rect = pygame.Rect(shield_x, shield_y, BRICK_WIDTH - 4, BRICK_HEIGHT - 4)
-        bricks.append({"rect": shield_rect, "hp": 4})  # Stronger shields
+        state.bricks.add(Brick(shield_rect, 4))  # Stronger shields
+
+class FireballStore(ArrayPool):
+    # Boss fireballs, stored like ProjectileStore: int rect corners in parallel
+    # arrays, packed in [0, count) in firing order. They only fall straight
+    # down, so x never changes after spawn
+    width = 10
+    height = 20
+    speed = 7  # Faster projectiles for hard difficulty
+    arrays = ("x", "y")
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.int64)  # left
+        self.y = np.zeros(capacity, dtype=np.int64)  # top
+
+    def spawn(self, x, y):
+        if self.count == len(self.x):
+            self.grow()
+        self.x[self.count] = x
+        self.y[self.count] = y
+        self.count += 1
+
+    def update(self, state):
+        n = self.count
+        if n == 0:
+            return
+        x = self.x[:n]
+        y = self.y[:n]
+        y += self.speed
+        # Swept test: each fireball covers the whole span from its previous
+        # top to its new bottom this tick, so it cannot step over the
+        # character however fast it falls
+        c = state.character.rect
+        hits = ((x < c.right) & (x + self.width > c.left) &
+                (y - self.speed < c.bottom) & (y + self.height > c.top))
+        for _ in range(np.count_nonzero(hits)):
+            state.game_over = True
+            state.emit("player_hit")
+        keep = np.flatnonzero(y <= HEIGHT)
+        self.count = len(keep)
+        self.x[:self.count] = x[keep]
+        self.y[:self.count] = y[keep]
+
+fireball_image = None
+
+def fireball_sprite():
+    global fireball_image
+    if fireball_image is None:
+        # Draw dinosaur fireballs; black is the colorkey, as for stars
+        fireball_image = pygame.Surface((16, 16))
+        profiler.count("surfaces")
+        pygame.draw.circle(fireball_image, (255, 100, 0), (8, 8), 8)  # Orange outer
+        pygame.draw.circle(fireball_image, (255, 200, 0), (8, 8), 5)  # Yellow middle
+        pygame.draw.circle(fireball_image, (255, 255, 100), (8, 8), 2)  # Bright center
+        fireball_image.set_colorkey(BLACK, pygame.RLEACCEL)
+    return fireball_image
+
+def draw_projectiles(surface, boss_projectiles):
+    n = boss_projectiles.count
+    if n == 0:
+        return []
+    # Sprite centred on each fireball rect's center
+    xs = (boss_projectiles.x[:n] + (boss_projectiles.width // 2 - 8)).tolist()
+    ys = (boss_projectiles.y[:n] + (boss_projectiles.height // 2 - 8)).tolist()
+    return surface.blits(zip(repeat(fireball_sprite()), zip(xs, ys)))
+
+def copy_entity(entity):
+    clone = copy.copy(entity)
+    clone.rect = entity.rect.copy()
+    return clone
+
+# Per-tick player input: held keys plus this tick's SPACE/R key presses
+Inputs = namedtuple("Inputs", ["left", "right", "fire", "fire_pressed", "restart"], defaults=[False] * 5)
+
+class GameState:
+    # The whole simulation. step() advances one fixed tick without touching
+    # the display or the mixer; sounds to play are reported by name in
+    # self.events for observers such as AudioPlayer. All randomness comes from
+    # self.rng, so a seed plus the input sequence reproduces a run exactly.
+    # endless=True plays one endless stream of brick rows instead of the levels
+    def __init__(self, level=1, seed=None, endless=False):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.endless = endless
+        self.tick = 0  # keeps counting across restarts
+        self.reset(level)
+
+    def reset(self, level=1):
+        if self.endless:
+            level = ENDLESS_LEVEL
+        self.level = level
+        self.score = 0
+        self.game_over = False
+        self.win = False
+        self.character = Character(level)
+        self.bricks = BrickField() if self.endless else create_bricks(level)
+        self.boss = create_boss() if LEVELS[level - 1].boss else None
+        self.projectiles = ProjectileStore()
+        self.powerups = []
+        self.boss_projectiles = FireballStore()
+        self.sparks = SparkPool()
+        self.events = []
+        if self.endless:
+            self.rows = EndlessRows(self.rng.getrandbits(32), BRICK_COLS)
+            for _ in range(ENDLESS_START_ROWS):
+                scroll_bricks(self)
+
+    def emit(self, event):
+        self.events.append(event)
+
+    def clone(self):
+        # Independent copy, cheap enough to take many of per frame for
+        # search-based bots: small objects and the entity pools are copied,
+        # the brick field is shared copy-on-write
+        clone = object.__new__(GameState)
+        clone.__dict__.update(self.__dict__)
+        clone.rng = random.Random()
+        clone.rng.setstate(self.rng.getstate())
+        clone.character = copy_entity(self.character)
+        clone.bricks = self.bricks.share()
+        clone.boss = copy_entity(self.boss) if self.boss else None
+        clone.powerups = [copy_entity(p) for p in self.powerups]
+        clone.projectiles = self.projectiles.copy()
+        clone.boss_projectiles = self.boss_projectiles.copy()
+        clone.sparks = self.sparks.copy()
+        clone.events = list(self.events)
+        if self.endless:
+            clone.rows = copy.deepcopy(self.rows)
+        return clone
+
+    def shoot(self):
+        character = self.character
+        if character.shoot():
+            self.projectiles.spawn(character.rect.centerx, character.rect.top, self.level, 0)
+
+    def step(self, inputs):
+        self.events = []
+        self.tick += 1
+        was_over = self.game_over
+        if inputs.fire_pressed and not self.game_over:
+            # Shoot single normal projectile
+            self.shoot()
+        if inputs.restart and self.game_over:
+            self.reset(1)
+            was_over = False
+        if inputs.left: self.character.move(-1)
+        if inputs.right: self.character.move(1)
 
-def draw_projectiles(surface):
-    for proj in boss_projectiles:
-        # Draw dinosaur fireballs
-        center_x = proj.centerx
-        center_y = proj.centery
-        
-        # Outer fire effect
-        pygame.draw.circle(surface, (255, 100, 0), (center_x, center_y), 8)  # Orange outer
-        pygame.draw.circle(surface, (255, 200, 0), (center_x, center_y), 5)  # Yellow middle
-        pygame.draw.circle(surface, (255, 255, 100), (center_x, center_y), 2)  # Bright center
-
-def update_projectiles(character):
-    global game_over
-    for proj in boss_projectiles[:]:
-        proj.y += 7  # Faster projectiles for hard difficulty
-        if proj.colliderect(character.rect):
-            game_over = True
-            if hit_sound:
-                hit_sound.play()
-        if proj.top > HEIGHT:
-            boss_projectiles.remove(proj)
-
-def main():
-    global LEVEL, score, game_over, bricks, projectiles
-    character = Character(LEVEL)
-    bricks = create_bricks(LEVEL)
-    boss = None
-    score = 0
-    running = True
-    game_over = False
-    win = False
-    gameover_sound_played = False
-    while running:
-        draw_background(screen)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: running = False
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE and not game_over:
-                    # Shoot single normal projectile
-                    if character.shoot():
-                        proj = Projectile(character.rect.centerx, character.rect.top, LEVEL, 0)
-                        projectiles.append(proj)
-                if event.key == pygame.K_r and game_over:
-                    LEVEL = 1
-                    character = Character(LEVEL)
-                    bricks = create_bricks(LEVEL)
-                    boss = None
-                    score = 0
-                    game_over = False
-                    win = False
-                    gameover_sound_played = False
-                    powerups.clear()
-                    boss_projectiles.clear()
-                    projectiles.clear()
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT]: character.move(-1)
-        if keys[pygame.K_RIGHT]: character.move(1)
-        
         # Normal rapid fire when holding space
-        if keys[pygame.K_SPACE] and not game_over:
-            if character.shoot():
-                # Single straight shot
-                proj = Projectile(character.rect.centerx, character.rect.top, LEVEL, 0)
-                projectiles.append(proj)
-        if not game_over:
-            character.update()
+        if inputs.fire and not self.game_over:
+            self.shoot()
+        cleared = False
+        if not self.game_over:
+            self.character.update()
             # Update projectiles
-            cleared = False  # Ensure cleared is always defined
-            for proj in projectiles[:]:
-                s, cleared = proj.update(bricks, boss)
-                score += s
-                if not proj.active:
-                    projectiles.remove(proj)
-                if cleared:
-                    break
-            for p in powerups[:]:
-                # Update powerup position with both horizontal and vertical movement
-                p["rect"].x += p["dx"]
-                p["rect"].y += p["dy"]
-                
-                # Keep powerups within screen bounds horizontally
-                if p["rect"].left < 0 or p["rect"].right > WIDTH:
-                    p["dx"] *= -0.5  # Bounce back with reduced speed
-                    p["rect"].x = max(0, min(WIDTH - p["rect"].width, p["rect"].x))
-                
-                if p["rect"].colliderect(character.rect):
-                    apply_powerup(character, p["type"])
-                    powerups.remove(p)
-                elif p["rect"].top > HEIGHT:
-                    powerups.remove(p)
-            if boss:
-                update_boss(boss)
-                update_projectiles(character)
-                
-        # Check for level completion
-        if cleared:
-            LEVEL += 1
-            if LEVEL == 5:  # Boss fight at level 5
-                boss = create_boss()
-                bricks = []
-                character = Character(LEVEL)
-            elif LEVEL <= FINAL_LEVEL:
-                bricks = create_bricks(LEVEL)
-                character = Character(LEVEL)
-                boss = None
-
-            if LEVEL > FINAL_LEVEL:
-                win = True
-                game_over = True
-
-            if win_sound:
-                win_sound.play()
-
-            # Play game over sound once when the game ends
-            if game_over and not gameover_sound_played and gameover_sound:
-                gameover_sound.play()
-                gameover_sound_played = True
-
-            # Clear projectiles when advancing level
-            projectiles.clear()
-        character.draw(screen)
-        
-        # Draw projectiles
-        for proj in projectiles:
-            proj.draw(screen)
-        draw_bricks(screen, bricks)
-        for p in powerups:
-            color = (0,255,0) if p["type"] in ["expand","slow","score"] else (255,0,0)
-            pygame.draw.rect(screen, color, p["rect"])
-        draw_sparks(screen)
-        draw_boss(screen, boss)
-        draw_projectiles(screen)
-        draw_text(screen, f"Score: {score}", small_font, WHITE, 80, 30, center=False)
-        # Display level with difficulty indicator
-        difficulty_names = {
-            1: "Level 1 (Easy)",
-            2: "Level 2 (Medium)", 
-            3: "Level 3 (Hard)",
-            4: "Level 4 (Very Hard)",
-            5: "Level 5 (Dinosaur Boss)"
-        }
-        level_text = difficulty_names.get(LEVEL, f"Level: {LEVEL}")
-        draw_text(screen, level_text, small_font, WHITE, WIDTH - 150, 30, center=False)
-        if not game_over:
-            draw_text(screen, "Hold SPACE for rapid fire! Defeat the Dinosaur Boss!", small_font, WHITE, WIDTH//2, HEIGHT-20)
-        if game_over:
-            if win:
-                draw_text(screen, "You Win!", font, (50, 205, 50), WIDTH//2, HEIGHT//2 - 40)
+            with profiler.section("update.projectiles"):
+                s, cleared = self.projectiles.update(self)
+            self.score += s
+            with profiler.section("update.powerups"):
+                update_powerups(self)
+            if self.boss:
+                with profiler.section("update.boss"):
+                    update_boss(self)
+                    self.boss_projectiles.update(self)
+            if self.endless and self.tick % ENDLESS_SCROLL_TICKS == 0:
+                scroll_bricks(self)
+        with profiler.section("update.sparks"):
+            self.sparks.update()
+
+        # Check for level completion; an endless field just waits for the next row
+        if cleared and not self.endless:
+            self.advance_level()
+        # Game over sound plays once, on a loss or a win
+        if self.game_over and not was_over:
+            self.emit("game_over")
+
+    def advance_level(self):
+        self.level += 1
+        if self.level <= FINAL_LEVEL:
+            self.bricks = create_bricks(self.level)
+            self.boss = create_boss() if LEVELS[self.level - 1].boss else None
+            self.character = Character(self.level)
+
+        if self.level > FINAL_LEVEL:
+            self.win = True
+            self.game_over = True
+        self.emit("level_cleared")
+
+        # Clear projectiles when advancing level
+        self.projectiles.clear()
+
+class DirtyRenderer:
+    # Opt-in render mode for slow displays. Background and bricks are cached
+    # in a backdrop; each frame only last frame's entity rects, changed brick
+    # cells and changed HUD slots are restored from it, and only the rects
+    # touched this frame are pushed with pygame.display.update
+    def __init__(self, surface, layer):
+        self.surface = surface
+        self.layer = layer  # the Renderer's BrickLayer
+        self.backdrop = surface.copy()
+        profiler.count("surfaces")
+        self.full = True
+        self.prev = []      # entity rects drawn last frame
+        self.hud = {}       # slot -> (key, rect) of the HUD string on screen
+        self.stale = set()  # HUD slots to push to the display this frame
+        self.outline = None  # outline passes the HUD was drawn with
+        self.restored = []
+
+    def compose(self, area=None):
+        if bg_image:
+            if area is None:
+                self.backdrop.blit(bg_image, (0, 0))
             else:
-                draw_text(screen, "Game Over", font, (255, 99, 71), WIDTH//2, HEIGHT//2 - 40)
-                if not gameover_sound_played and gameover_sound:
-                    gameover_sound.play()
-                    gameover_sound_played = True
-            draw_text(screen, f"Final Score: {score}", small_font, WHITE, WIDTH//2, HEIGHT//2)
-            draw_text(screen, "Press R to Restart", small_font, WHITE, WIDTH//2, HEIGHT//2 + 40)
-        pygame.display.flip()
-        clock.tick(FPS)
+                self.backdrop.blit(bg_image, area.topleft, area)
+        else:
+            self.backdrop.fill(BG_COLOR, area)
+        self.layer.blit(self.backdrop, area)
+
+    def begin(self, field, hud):
+        changed = self.layer.refresh(field)
+        if changed is None or self.full:
+            self.compose()
+            self.surface.blit(self.backdrop, (0, 0))
+            self.full = True
+            restore = []
+        else:
+            for rect in changed:
+                self.compose(rect)
+            restore = self.prev + changed
+
+        # Every HUD string is wiped before anything is drawn and stamped again
+        # last, as in a full repaint: entities passing under it never end up
+        # on top, and outlines never double up. A string is only pushed to
+        # the display when its text changed or something restored over it;
+        # entities drawn over it push their own rects
+        slots = set()
+        self.stale = set()
+        for slot, key, _ in hud:
+            slots.add(slot)
+            old = self.hud.get(slot)
+            if (self.full or old is None or old[0] != key or quality.outline != self.outline
+                    or old[1].collidelist(restore) != -1):
+                self.stale.add(slot)
+                if old:
+                    restore.append(old[1])
+        for slot in list(self.hud):
+            if slot not in slots:
+                restore.append(self.hud.pop(slot)[1])
+        self.outline = quality.outline
+
+        for rect in restore:
+            self.surface.blit(self.backdrop, rect, rect)
+        for key, rect in self.hud.values():
+            self.surface.blit(self.backdrop, rect, rect)
+        self.restored = restore
+
+    def behind_bricks(self, drawn):
+        # For entities drawn before the bricks, like moving stars
+        for rect in drawn:
+            self.layer.blit(self.surface, rect)
+        return drawn
+
+    def finish(self, drawn, hud):
+        updated = []
+        for slot, key, draw in hud:
+            rect = draw()
+            self.hud[slot] = (key, rect)
+            if slot in self.stale:
+                updated.append(rect)
+        if self.full:
+            pygame.display.flip()
+            self.full = False
+        else:
+            pygame.display.update(self.restored + drawn + updated)
+        self.prev = drawn
+
+def hud_items(surface, state, scale=1):
+    # (slot, key, draw) for each HUD string this frame; key changes with the text.
+    # scale > 1 lays the HUD out on a surface that many times the world's size
+    score = state.score
+    big, small = hud_fonts(scale)
+    # Display level with difficulty indicator
+    if state.endless:
+        level_text = "Endless"
+    elif state.level <= FINAL_LEVEL:
+        level_text = LEVELS[state.level - 1].name
+    else:
+        level_text = f"Level: {state.level}"
+
+    def text_item(string, font, color, x, y, center=True):
+        return lambda: draw_text(surface, string, font, color, x * scale, y * scale, center)
+
+    def counter_item(label, value, font, x, y, center=True):
+        return lambda: draw_counter(surface, label, value, font, WHITE, x * scale, y * scale, center)
+
+    items = [
+        ("score", score, counter_item("Score: ", score, small, 80, 30, center=False)),
+        ("level", level_text, text_item(level_text, small, WHITE, WIDTH - 150, 30, center=False)),
+    ]
+    if not state.game_over:
+        items.append(("hint", None, text_item("Hold SPACE for rapid fire! Defeat the Dinosaur Boss!", small, WHITE, WIDTH//2, HEIGHT-20)))
+    if state.game_over:
+        if state.win:
+            items.append(("result", state.win, text_item("You Win!", big, (50, 205, 50), WIDTH//2, HEIGHT//2 - 40)))
+        else:
+            items.append(("result", state.win, text_item("Game Over", big, (255, 99, 71), WIDTH//2, HEIGHT//2 - 40)))
+        items.append(("final", score, counter_item("Final Score: ", score, small, WIDTH//2, HEIGHT//2)))
+        items.append(("restart", None, text_item("Press R to Restart", small, WHITE, WIDTH//2, HEIGHT//2 + 40)))
+    return items
+
+class Renderer:
+    # Observer that draws a GameState to the screen, either as a full repaint
+    # or through DirtyRenderer. present=False draws to an offscreen surface
+    # without flipping the display; with an Upscaler the surface is the
+    # offscreen world, upscaled onto the window when the frame is presented
+    def __init__(self, surface, dirty_rects=False, seed=None, star_count=STAR_COUNT, present=True, upscaler=None):
+        if dirty_rects and upscaler:
+            raise ValueError("dirty rects need the world drawn straight to the window")
+        self.surface = surface
+        self.present = present
+        self.upscaler = upscaler
+        self.brick_layer = BrickLayer()
+        self.dirty = DirtyRenderer(surface, self.brick_layer) if dirty_rects else None
+        # Stars get their own stream so drawing never perturbs the game's rng
+        self.stars = Starfield(star_count, seed)
+        self.tick = None
+
+    def draw(self, state):
+        surface = self.surface
+        # Stars move once per simulation tick, whatever the render rate
+        if not bg_image:
+            ticks = 1 if self.tick is None else min(max(state.tick - self.tick, 0), MAX_STEPS_PER_FRAME)
+            for _ in range(ticks):
+                self.stars.update()
+        self.tick = state.tick
+
+        native_hud = self.upscaler is not None and self.upscaler.native_hud
+        if native_hud:
+            hud = hud_items(self.upscaler.view, state, self.upscaler.factor)
+        else:
+            hud = hud_items(surface, state)
+        with profiler.section("draw.background"):
+            if self.dirty:
+                self.dirty.begin(state.bricks, hud)
+                drawn = [] if bg_image else self.dirty.behind_bricks(draw_stars(surface, self.stars))
+            else:
+                draw_background(surface, self.stars)
+                drawn = []
+        if not self.dirty:
+            # Right on the background, where DirtyRenderer bakes them into its
+            # backdrop, so both modes layer entities over bricks alike (a
+            # scrolling endless row can land on a shot in flight)
+            with profiler.section("draw.bricks"):
+                draw_bricks(surface, state.bricks, self.brick_layer)
+        with profiler.section("draw.character"):
+            drawn.append(state.character.draw(surface))
+
+        # Draw projectiles
+        with profiler.section("draw.projectiles"):
+            drawn += draw_player_projectiles(surface, state.projectiles)
+        with profiler.section("draw.powerups"):
+            for p in state.powerups:
+                color = (0,255,0) if p.type in ["expand","slow","score"] else (255,0,0)
+                drawn.append(pygame.draw.rect(surface, color, p.rect))
+        with profiler.section("draw.sparks"):
+            drawn += draw_sparks(surface, state.sparks)
+        with profiler.section("draw.boss"):
+            if state.boss:
+                drawn.append(draw_boss(surface, state.boss))
+            drawn += draw_projectiles(surface, state.boss_projectiles)
+        if profiler.overlay:
+            with profiler.section("draw.overlay"):
+                drawn.append(profiler.draw_overlay(surface))
+        if self.dirty:
+            # HUD redraws and the display update happen together here
+            with profiler.section("draw.present"):
+                self.dirty.finish(drawn, hud)
+        else:
+            if not native_hud:
+                with profiler.section("draw.hud"):
+                    for slot, key, draw in hud:
+                        draw()
+            if self.upscaler:
+                self.upscaler.present(surface)
+                if native_hud:
+                    with profiler.section("draw.hud"):
+                        for slot, key, draw in hud:
+                            draw()
+            if self.present:
+                with profiler.section("draw.present"):
+                    pygame.display.flip()
+
+def draw_loading_screen(surface, progress):
+    surface.fill(BG_COLOR)
+    draw_text(surface, "Human vs Dinosaur", font, WHITE, WIDTH//2, HEIGHT//2 - 60)
+    draw_text(surface, "Loading...", small_font, WHITE, WIDTH//2, HEIGHT//2)
+    bar = pygame.Rect(WIDTH//2 - 150, HEIGHT//2 + 30, 300, 12)
+    pygame.draw.rect(surface, WHITE, bar, 1)
+    pygame.draw.rect(surface, (50, 205, 50), (bar.x + 2, bar.y + 2, int((bar.width - 4) * progress), bar.height - 4))
+    if upscaler:
+        upscaler.present(surface)
+    pygame.display.flip()
+
+def loading_screen(preloader, audio, render_fps):
+    # Decodes the background and the sounds needed before the boss on worker
+    # threads while the loading screen keeps drawing; False if the window closed
+    global bg_image
+    background = preloader.submit(assets.image, bg_path, (WIDTH, HEIGHT)) if os.path.exists(bg_path) else None
+    audio.preload(STARTUP_SOUNDS)
+    while not preloader.done:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                return False
+        draw_loading_screen(screen, preloader.progress())
+        clock.tick(render_fps)
+    bg_image = background.result() if background else None
+    audio.preload(STARTUP_SOUNDS)  # collect the finished loads
+    return True
+
+def prefetch_boss(audio):
+    # Run during level 4, so the boss fight starts with nothing left to load
+    audio.preload(BOSS_SOUNDS)
+    boss_sprite(create_boss().rect.size)
+    render_text("Dinosaur Boss HP: ", small_font, WHITE)
+
+def report_startup(marks):
+    # marks: (phase, perf_counter) pairs from the start of main()
+    phases = ", ".join(f"{name} {(t - prev) * 1000:.1f} ms" for (_, prev), (name, t) in zip(marks, marks[1:]))
+    print(f"startup: {phases}; first frame after {(marks[-1][1] - marks[0][1]) * 1000:.1f} ms")
+    print(f"sounds: {assets.decoded} decoded, {assets.cached} from the PCM cache")
+
+def main(dirty_rects=False, render_fps=FPS, seed=None, record=None, profile=False, trace=None, time_startup=False,
+         endless=False, autosave=None, quality_mode="auto", scaling="native", fullscreen=False, window_size=None,
+         native_hud=False):
+    marks = [("start", time.perf_counter())]
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s: %(message)s")
+    governor = None
+    if quality_mode == "auto":
+        governor = Governor([tier.name for tier in QUALITY_TIERS], STEP_MS, on_change=set_quality)
+    else:
+        set_quality([tier.name for tier in QUALITY_TIERS].index(quality_mode))
+    recorder = None
+    if record:
+        # A replay needs a known seed; replay.py imports this module, so load it lazily
+        from replay import Recorder
+        if seed is None:
+            seed = random.randrange(2 ** 32)
+        recorder = Recorder(seed, endless)
+    init_display(background=False, scaling=scaling, fullscreen=fullscreen, window_size=window_size, native_hud=native_hud)
+    marks.append(("display", time.perf_counter()))
+    preloader = Preloader()
+    audio = AudioPlayer(preloader)
+    running = loading_screen(preloader, audio, render_fps)
+    marks.append(("loading", time.perf_counter()))
+    start_music()
+    renderer = Renderer(screen, dirty_rects, seed, upscaler=upscaler)
+    state = None
+    autosaver = None
+    if autosave:
+        # Kiosk mode: carry on from the last save, e.g. after a power cut
+        import snapshot
+        state = snapshot.resume(autosave)
+        autosaver = snapshot.Autosaver(autosave)
+    if state is None:
+        state = GameState(seed=seed, endless=endless)
+    boss_ready = False
+    if trace:
+        profiler.start_trace()
+    if profile:
+        profiler.toggle_overlay()
+    # Fixed-timestep loop: the simulation always advances in STEP_MS ticks,
+    # rendering runs at render_fps (0 = uncapped)
+    accumulator = 0.0
+    fire_pressed = restart = False
+    while running:
+        frame_start = time.perf_counter()
+        profiler.begin_frame()
+        with profiler.section("input"):
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT: running = False
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_SPACE: fire_pressed = True
+                    if event.key == pygame.K_r: restart = True
+                    if event.key == pygame.K_F3: profiler.toggle_overlay()
+        while accumulator >= STEP_MS:
+            with profiler.section("input"):
+                keys = pygame.key.get_pressed()
+                inputs = Inputs(keys[pygame.K_LEFT], keys[pygame.K_RIGHT], keys[pygame.K_SPACE], fire_pressed, restart)
+                if recorder:
+                    recorder.record(inputs)
+            with profiler.section("update"):
+                state.step(inputs)
+            fire_pressed = restart = False
+            with profiler.section("audio"):
+                audio.play(state.events)
+            accumulator -= STEP_MS
+            if autosaver and state.tick % AUTOSAVE_TICKS == 0:
+                autosaver.save(state)
+        if not boss_ready and not state.endless and any(level.boss for level in LEVELS[state.level - 1:state.level + 1]):
+            prefetch_boss(audio)
+            boss_ready = True
+        with profiler.section("draw"):
+            renderer.draw(state)
+        if time_startup:
+            marks.append(("first frame", time.perf_counter()))
+            report_startup(marks)
+            running = False
+        if governor:
+            # Work only: the time clock.tick() sleeps is headroom, not load
+            governor.frame((time.perf_counter() - frame_start) * 1000)
+        if profiler.enabled:
+            profiler.end_frame({"projectiles": len(state.projectiles), "sparks": len(state.sparks),
+                                "bricks": len(state.bricks), "boss_projectiles": len(state.boss_projectiles),
+                                "quality_tier": QUALITY_TIERS.index(quality)})
+        accumulator = min(accumulator + clock.tick(render_fps), STEP_MS * MAX_STEPS_PER_FRAME)
+    if recorder:
+        recorder.save(record)
+    if autosaver:
+        autosaver.close(state)
+    if trace:
+        profiler.save_trace(trace)
+    if governor:
+        governor.summary()
+    preloader.shutdown()
     pygame.quit()
     sys.exit()
 
+def parse_size(text):
+    w, _, h = text.lower().partition("x")
+    return int(w), int(h)
+
+def parse_seed(text):
+    # Replays and snapshots store the seed as a signed 64-bit integer
+    seed = int(text)
+    if not -2 ** 63 <= seed < 2 ** 63:
+        raise argparse.ArgumentTypeError(f"seed {text} does not fit in a signed 64-bit integer")
+    return seed
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Human vs Dinosaur - Brick Shooter!")
+    parser.add_argument("--dirty-rects", action="store_true", help="only repaint changed regions (for slow displays)")
+    parser.add_argument("--fps", type=int, default=FPS, help="render frame cap, 0 for uncapped; the game itself always runs at %d ticks/s" % FPS)
+    parser.add_argument("--seed", type=parse_seed, help="seed for a reproducible game")
+    parser.add_argument("--record", metavar="PATH", help="save this session's inputs as a replay (see replay.py)")
+    parser.add_argument("--profile", action="store_true", help="start with the profiler overlay shown (F3 toggles it)")
+    parser.add_argument("--trace", metavar="PATH", help="write a Chrome trace of every frame here on exit")
+    parser.add_argument("--time-startup", action="store_true", help="print startup timings after the first frame and quit")
+    parser.add_argument("--endless", action="store_true", help="play an endless stream of brick rows instead of the levels")
+    parser.add_argument("--autosave", metavar="PATH", help="resume the game saved here, and keep saving it (kiosk mode)")
+    parser.add_argument("--quality", default="auto", choices=["auto"] + [tier.name for tier in QUALITY_TIERS],
+                        help="render quality; auto adapts it to the measured frame time")
+    parser.add_argument("--scaling", default="native", choices=["native", "scaled", "integer"],
+                        help="native: a %dx%d window; scaled: SDL stretches the game over a bigger window on the GPU; "
+                             "integer: the game is drawn at %dx%d offscreen and blitted at a whole multiple"
+                             % (WIDTH, HEIGHT, WIDTH, HEIGHT))
+    parser.add_argument("--fullscreen", action="store_true", help="fill the screen (with --scaling scaled or integer, "
+                                                                  "at the desktop resolution)")
+    parser.add_argument("--window", type=parse_size, metavar="WxH", help="window size for --scaling integer")
+    parser.add_argument("--native-hud", action="store_true", help="with --scaling integer, draw the HUD at window "
+                                                                  "resolution instead of upscaling it")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.record and args.autosave:
+        sys.exit("--record and --autosave cannot be combined: a replay has to start from a new game")
+    if args.dirty_rects and args.scaling == "integer":
+        sys.exit("--dirty-rects cannot be combined with --scaling integer: every frame is upscaled whole")
+    if (args.window or args.native_hud) and args.scaling != "integer":
+        sys.exit("--window and --native-hud need --scaling integer")
+    if args.window and not fits(args.window):
+        sys.exit(f"--window must be at least {WIDTH}x{HEIGHT}")
+    main(dirty_rects=args.dirty_rects, render_fps=args.fps, seed=args.seed, record=args.record,
+         profile=args.profile, trace=args.trace, time_startup=args.time_startup, endless=args.endless,
+         autosave=args.autosave, quality_mode=args.quality, scaling=args.scaling, fullscreen=args.fullscreen,
+         window_size=args.window, native_hud=args.native_hud)
@@ -0,0 +1,24 @@
+# Tests run headless: no window, no audio device
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pytest
+
+import brickshooting as game
+
+def scripted(tick):
+    # Sweeps left and right under rapid fire, tapping fire now and then
+    return game.Inputs(left=tick % 90 < 45, right=tick % 90 >= 45, fire=tick % 240 < 200,
+                       fire_pressed=tick % 37 == 0)
+
+@pytest.fixture
+def play():
+    # play(state, ticks) steps state through the scripted inputs from its current tick
+    def run(state, ticks):
+        for _ in range(ticks):
+            state.step(scripted(state.tick))
+        return state
+    return run
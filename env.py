@@ -0,0 +1,204 @@
+# Gym-style environment for bots that play and stress-test the game.
+#
+#   env = BrickEnv(seed=1, frame_skip=4)
+#   obs = env.reset()
+#   obs, reward, done, info = env.step(SHOOT)
+#
+#   envs = VectorEnv(64, seed=1, frame_skip=4)     # 64 games in lockstep
+#   obs = envs.reset()                             # (64, OBS_SIZE) float32
+#   obs, rewards, dones, infos = envs.step(actions)
+#
+#   python env.py --envs 64 --steps 20000 --frame-skip 4 [--pixels 80x60]
+#
+# Observations are a flat float32 vector by default (see observe()), or with
+# pixels=(width, height) a grayscale uint8 image of the frame, drawn to an
+# offscreen surface and scaled down. The reward is the score gained; an
+# episode ends on a win, a death or after max_ticks.
+
+import argparse
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import numpy as np
+import pygame
+import brickshooting as game
+
+NOOP, LEFT, RIGHT, SHOOT = range(4)
+ACTIONS = [game.Inputs(), game.Inputs(left=True), game.Inputs(right=True), game.Inputs(fire=True)]
+ACTION_NAMES = ["noop", "left", "right", "shoot"]
+
+MAX_TICKS = 60 * 60 * 10  # ten minutes of game time, as in balance.py
+MAX_FIREBALLS = 8  # lowest fireballs reported
+MAX_POWERUPS = 4   # lowest powerups reported
+MAX_SHOTS = 64     # player shot count is reported as a fraction of this
+
+# Observation layout: offsets into the vector
+PLAYER_AT = 0   # center x, width, speed, can shoot, firing multiplier, level, shots
+BOSS_AT = 7     # present, center x, center y, hp fraction, phase
+FIREBALLS_AT = BOSS_AT + 5                     # per fireball: present, x from player, bottom
+POWERUPS_AT = FIREBALLS_AT + 3 * MAX_FIREBALLS  # per powerup: present, x from player, y, type
+BRICKS_AT = POWERUPS_AT + 4 * MAX_POWERUPS      # brick grid cells, 1 where a brick is
+OBS_SIZE = BRICKS_AT + game.BRICK_GRID_ROWS * game.BRICK_COLS
+
+GRAY = np.array([77, 150, 29], dtype=np.uint16)  # luma weights, sum 256
+
+def observe(state, out):
+    # Writes state's observation vector into out, positions scaled to about [-1, 1]
+    out[:] = 0
+    char = state.character
+    cx = char.rect.centerx
+    out[PLAYER_AT:BOSS_AT] = (cx / game.WIDTH, char.rect.width / game.WIDTH, char.speed / 18,
+                              char.can_shoot(), char.firing_multiplier / 3, state.level / game.FINAL_LEVEL,
+                              min(len(state.projectiles), MAX_SHOTS) / MAX_SHOTS)
+    boss = state.boss
+    if boss:
+        out[BOSS_AT:FIREBALLS_AT] = (1, boss.rect.centerx / game.WIDTH, boss.rect.centery / game.HEIGHT,
+                                     boss.hp / boss.max_hp, boss.phase / 3)
+
+    fireballs = state.boss_projectiles
+    n = fireballs.count
+    if n:
+        # The lowest fireballs are the ones about to land
+        order = np.argsort(-fireballs.y[:n], kind="stable")[:MAX_FIREBALLS]
+        block = out[FIREBALLS_AT:POWERUPS_AT].reshape(MAX_FIREBALLS, 3)
+        k = len(order)
+        block[:k, 0] = 1
+        block[:k, 1] = (fireballs.x[order] + fireballs.width // 2 - cx) / game.WIDTH
+        block[:k, 2] = (fireballs.y[order] + fireballs.height) / game.HEIGHT
+
+    if state.powerups:
+        powerups = sorted(state.powerups, key=lambda p: -p.rect.bottom)[:MAX_POWERUPS]
+        block = out[POWERUPS_AT:BRICKS_AT].reshape(MAX_POWERUPS, 4)
+        for row, p in zip(block, powerups):
+            row[:] = (1, (p.rect.centerx - cx) / game.WIDTH, p.rect.centery / game.HEIGHT,
+                      game.POWERUP_TYPES.index(p.type) / (len(game.POWERUP_TYPES) - 1))
+
+    # The field keeps a per-cell brick count up to date, so this is one copy
+    np.minimum(state.bricks.occupancy, 1, out=out[BRICKS_AT:].reshape(state.bricks.occupancy.shape),
+               casting="unsafe")
+    return out
+
+def init_offscreen():
+    # Fonts for the HUD; pixel observations never open a window
+    if game.font is None:
+        pygame.font.init()
+        game.load_fonts()
+
+class BrickEnv:
+    def __init__(self, seed=None, frame_skip=1, pixels=None, max_ticks=MAX_TICKS):
+        # frame_skip: ticks each action is held for; pixels: (width, height)
+        # of grayscale observations, or None for observation vectors
+        self.rng = random.Random(seed)  # seeds each episode
+        self.frame_skip = frame_skip
+        self.pixels = pixels
+        self.max_ticks = max_ticks
+        self.state = None
+        self.renderer = None
+        if pixels:
+            init_offscreen()
+            # No stars: they would only be noise to a learner
+            self.renderer = game.Renderer(pygame.Surface((game.WIDTH, game.HEIGHT)), star_count=0, present=False)
+            self.small = pygame.Surface(pixels)
+
+    @property
+    def observation_shape(self):
+        return (self.pixels[1], self.pixels[0]) if self.pixels else (OBS_SIZE,)
+
+    @property
+    def observation_dtype(self):
+        return np.uint8 if self.pixels else np.float32
+
+    def reset(self, seed=None, out=None):
+        if seed is None:
+            seed = self.rng.getrandbits(32)
+        self.state = game.GameState(seed=seed)
+        if self.renderer:
+            self.renderer.tick = None
+        return self.observe(out)
+
+    def step(self, action, out=None):
+        state = self.state
+        inputs = ACTIONS[action]
+        score = state.score
+        for _ in range(self.frame_skip):
+            state.step(inputs)
+            if state.game_over:
+                break
+        timeout = self.max_ticks is not None and state.tick >= self.max_ticks
+        info = {"score": state.score, "level": state.level, "tick": state.tick, "win": state.win,
+                "timeout": timeout and not state.game_over}
+        return self.observe(out), state.score - score, state.game_over or timeout, info
+
+    def observe(self, out=None):
+        if out is None:
+            out = np.zeros(self.observation_shape, self.observation_dtype)
+        if not self.pixels:
+            return observe(self.state, out)
+        self.renderer.draw(self.state)
+        pygame.transform.smoothscale(self.renderer.surface, self.pixels, self.small)
+        # pixels3d is (width, height, rgb); the observation is (height, width)
+        rgb = pygame.surfarray.pixels3d(self.small)
+        out[:] = (np.dot(rgb, GRAY) >> 8).T
+        del rgb  # releases the surface lock
+        return out
+
+class VectorEnv:
+    # num_envs independent games stepped in lockstep, observations batched
+    # into one array. A finished game is reset straight away: its done flag
+    # and info belong to the step that ended it, its observation to the new
+    # episode's start
+    def __init__(self, num_envs, seed=None, **kwargs):
+        self.envs = [BrickEnv(None if seed is None else seed + i, **kwargs) for i in range(num_envs)]
+        env = self.envs[0]
+        self.obs = np.zeros((num_envs,) + env.observation_shape, env.observation_dtype)
+        self.rewards = np.zeros(num_envs, dtype=np.float32)
+        self.dones = np.zeros(num_envs, dtype=bool)
+
+    def __len__(self):
+        return len(self.envs)
+
+    def reset(self):
+        for env, out in zip(self.envs, self.obs):
+            env.reset(out=out)
+        return self.obs.copy()
+
+    def step(self, actions):
+        infos = []
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            _, self.rewards[i], self.dones[i], info = env.step(action, out=self.obs[i])
+            if self.dones[i]:
+                env.reset(out=self.obs[i])
+            infos.append(info)
+        return self.obs.copy(), self.rewards.copy(), self.dones.copy(), infos
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Step random agents through the environment and report throughput.")
+    parser.add_argument("--envs", type=int, default=16, help="games stepped in lockstep")
+    parser.add_argument("--steps", type=int, default=5000, help="vector steps to take")
+    parser.add_argument("--frame-skip", type=int, default=4, help="ticks per action")
+    parser.add_argument("--pixels", type=game.parse_size, help="grayscale pixel observations, e.g. 80x60")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    envs = VectorEnv(args.envs, args.seed, frame_skip=args.frame_skip, pixels=args.pixels)
+    rng = np.random.default_rng(args.seed)
+    envs.reset()
+    episodes = 0
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        _, _, dones, _ = envs.step(rng.integers(0, len(ACTIONS), len(envs)))
+        episodes += int(dones.sum())
+    wall = time.perf_counter() - start
+    steps = args.steps * len(envs)
+    print(f"{steps} steps ({steps * args.frame_skip} ticks), {episodes} episodes in {wall:.2f} s: "
+          f"{steps / wall:.0f} steps/s, {steps / wall * 3600 / 1e6:.1f}M steps/hour")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# Adaptive quality: watches how long each frame's work takes against the frame
+# budget and moves between quality tiers (0 = best) to stay inside it.
+#   - the tier drops one step when the rolling mean over `window` frames
+#     exceeds degrade_at x budget
+#   - it rises one step after `hold` frames in a row with a rolling mean under
+#     restore_at x budget
+# After a change the window starts over, so each decision measures frames of
+# the current tier only. Every change is logged, and summary() reports the
+# share of frames spent in each tier.
+
+import logging
+from collections import deque
+
+log = logging.getLogger("quality")
+
+class Governor:
+    def __init__(self, tiers, budget_ms, on_change=None, window=30, hold=180, degrade_at=0.9, restore_at=0.5):
+        # tiers: tier names, best first; on_change(tier) applies a new tier
+        self.tiers = tiers
+        self.budget_ms = budget_ms
+        self.on_change = on_change
+        self.window = window
+        self.hold = hold
+        self.degrade_at = degrade_at
+        self.restore_at = restore_at
+        self.tier = 0
+        self.recent = deque(maxlen=window)
+        self.total = 0.0  # sum of self.recent
+        self.calm = 0  # consecutive frames with headroom
+        self.frames = [0] * len(tiers)  # frames spent in each tier
+        self.changes = 0
+
+    def frame(self, work_ms):
+        # Call once per frame with the time spent updating and drawing it
+        self.frames[self.tier] += 1
+        if len(self.recent) == self.window:
+            self.total -= self.recent[0]
+        self.recent.append(work_ms)
+        self.total += work_ms
+        if len(self.recent) < self.window:
+            return self.tier
+        mean = self.total / self.window
+        if mean > self.budget_ms * self.degrade_at and self.tier < len(self.tiers) - 1:
+            self.set_tier(self.tier + 1, mean)
+        elif mean < self.budget_ms * self.restore_at and self.tier > 0:
+            self.calm += 1
+            if self.calm >= self.hold:
+                self.set_tier(self.tier - 1, mean)
+        else:
+            self.calm = 0
+        return self.tier
+
+    def set_tier(self, tier, mean_ms=None):
+        if mean_ms is not None:
+            log.info("%s -> %s (%.1f ms per frame over the last %d, budget %.1f ms)",
+                     self.tiers[self.tier], self.tiers[tier], mean_ms, self.window, self.budget_ms)
+        self.tier = tier
+        self.recent.clear()
+        self.total = 0.0
+        self.calm = 0
+        self.changes += 1
+        if self.on_change:
+            self.on_change(tier)
+
+    def summary(self):
+        total = sum(self.frames) or 1
+        shares = ", ".join(f"{name} {100 * n / total:.1f}%" for name, n in zip(self.tiers, self.frames))
+        log.info("tiers over %d frames (%d changes): %s", sum(self.frames), self.changes, shares)
@@ -0,0 +1,126 @@
+# Level files. Each level is a JSON file in levels/, played in file name order:
+#
+#   {
+#     "name": "Level 2 (Medium)",
+#     "hitbox": [22, 42], "projectile_speed": 14, "powerup_chance": 0.25,
+#     "layout": ["2222222222",
+#                "2222222222",
+#                "1111111111"]
+#   }
+#
+# A layout row has one character per brick column: the brick's hp, 1-9, or
+# "." for no brick. A boss level has "boss": true and no layout.
+#
+# A level is compiled to a small binary record, a header plus one hp byte
+# per cell. The record is cached on disk under the hash of the source file,
+# so an edited level is recompiled and an unchanged one is never parsed again.
+
+import hashlib
+import json
+import os
+import random
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+MAGIC = b"BSLV"
+VERSION = 1
+# magic, version, boss, hitbox width, hitbox height, projectile speed,
+# powerup chance, rows, cols, name length; then the name and the hp grid
+HEADER = struct.Struct("<4sBBHHHfBBB")
+
+# tuning: {"hitbox": (w, h), "projectile_speed": int, "powerup_chance": float}
+# grid: uint8 hp per (row, col), 0 for an empty cell
+Level = namedtuple("Level", ["name", "boss", "tuning", "grid"])
+
+def compile_level(source, cols, where="level"):
+    boss = bool(source.get("boss", False))
+    layout = source.get("layout", [])
+    if boss and layout:
+        raise ValueError(f"{where}: a boss level has no layout")
+    if not boss and not layout:
+        raise ValueError(f"{where}: a brick level needs a layout")
+    grid = np.zeros((len(layout), cols), dtype=np.uint8)
+    for row, line in enumerate(layout):
+        if len(line) > cols:
+            raise ValueError(f"{where}: layout row {row} is wider than {cols} columns")
+        for col, ch in enumerate(line):
+            if ch.isdigit() and ch != "0":
+                grid[row, col] = int(ch)
+            elif ch != ".":
+                raise ValueError(f"{where}: bad brick {ch!r} in layout row {row}")
+    w, h = source["hitbox"]
+    tuning = {"hitbox": (int(w), int(h)), "projectile_speed": int(source["projectile_speed"]),
+              "powerup_chance": float(source["powerup_chance"])}
+    return Level(str(source["name"]), boss, tuning, grid)
+
+def pack(level):
+    name = level.name.encode("utf-8")
+    rows, cols = level.grid.shape
+    w, h = level.tuning["hitbox"]
+    header = HEADER.pack(MAGIC, VERSION, level.boss, w, h, level.tuning["projectile_speed"],
+                         level.tuning["powerup_chance"], rows, cols, len(name))
+    return header + name + level.grid.tobytes()
+
+def unpack(data):
+    magic, version, boss, w, h, speed, chance, rows, cols, name_len = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a compiled level")
+    pos = HEADER.size + name_len
+    name = data[HEADER.size:pos].decode("utf-8")
+    grid = np.frombuffer(data, dtype=np.uint8, count=rows * cols, offset=pos).reshape(rows, cols).copy()
+    # The float32 round trip is undone so tuning matches the source exactly
+    tuning = {"hitbox": (w, h), "projectile_speed": speed, "powerup_chance": round(chance, 6)}
+    return Level(name, bool(boss), tuning, grid)
+
+def load_level(path, cols, cache_dir=None):
+    with open(path, "rb") as f:
+        source = f.read()
+    cached = None
+    if cache_dir:
+        key = hashlib.sha1(source).hexdigest()
+        cached = os.path.join(cache_dir, f"{key}-{cols}-v{VERSION}.lvl")
+        try:
+            with open(cached, "rb") as f:
+                return unpack(f.read())
+        except (OSError, ValueError, struct.error):
+            pass
+    level = compile_level(json.loads(source), cols, os.path.basename(path))
+    if cached:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Written aside and renamed, so a crash never leaves half a record
+            tmp = f"{cached}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(pack(level))
+            os.replace(tmp, cached)
+        except OSError:
+            pass  # a read-only install just compiles every launch
+    return level
+
+def load_levels(directory, cols, cache_dir=None):
+    names = sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+    if not names:
+        raise ValueError(f"no levels in {directory}")
+    return [load_level(os.path.join(directory, name), cols, cache_dir) for name in names]
+
+class EndlessRows:
+    # Endless stream of brick rows (lists of hp per column), denser and
+    # tougher the further it goes. An iterator class rather than a generator
+    # so that game states holding one can still be copied
+    def __init__(self, seed, cols):
+        self.rng = random.Random(seed)
+        self.cols = cols
+        self.count = 0  # rows produced so far
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        rng = self.rng
+        depth = self.count
+        self.count += 1
+        fill = min(0.9, 0.5 + depth / 200)
+        max_hp = min(4, 1 + depth // 25)
+        return [rng.randint(1, max_hp) if rng.random() < fill else 0 for _ in range(self.cols)]
@@ -0,0 +1,170 @@
+# Frame profiler for the main loop: named section timers, per-frame counters,
+# an on-screen overlay and Chrome trace export (chrome://tracing, Perfetto).
+#
+# While disabled, section() hands back one shared no-op context manager and
+# count() returns straight away, so the hooks can stay in the hot paths.
+
+import json
+import time
+from collections import deque
+
+import pygame
+
+HISTORY = 240  # frames kept for the overlay graph
+BUDGET_MS = 1000 / 60
+GRAPH_MAX_MS = BUDGET_MS * 2
+REFRESH_FRAMES = 30  # overlay text is re-rendered twice a second, from averages
+OVERLAY_WIDTH = 420
+GRAPH_HEIGHT = 60
+LINE_HEIGHT = 13
+
+class NullSection:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SECTION = NullSection()
+
+class Section:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, self.start, time.perf_counter_ns())
+        return False
+
+class Profiler:
+    def __init__(self, history=HISTORY):
+        self.enabled = False
+        self.overlay = False
+        self.history = deque(maxlen=history)  # (frame ms, {section: ms}, {counter: value})
+        self.trace = None  # Chrome trace events while recording
+        self.origin = time.perf_counter_ns()
+        self.frame_start = None
+        self.sections = {}
+        self.counters = {}
+        self.counter_names = set()  # reported as 0 in frames where they did not fire
+        self.panel = None
+        self.panel_age = 0
+        self.font = None
+
+    def enable(self, enabled=True):
+        # Takes effect from the next begin_frame(), so no frame is half-timed
+        enabled = enabled or self.overlay or self.trace is not None
+        if enabled != self.enabled:
+            self.enabled = enabled
+            self.frame_start = None
+
+    def toggle_overlay(self):
+        self.overlay = not self.overlay
+        self.panel = None
+        self.enable(self.overlay)
+
+    def start_trace(self):
+        self.trace = []
+        self.enable()
+
+    def save_trace(self, path):
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.trace or [], "displayTimeUnit": "ms"}, f)
+
+    def section(self, name):
+        if not self.enabled:
+            return NULL_SECTION
+        return Section(self, name)
+
+    def add(self, name, start, end):
+        self.sections[name] = self.sections.get(name, 0) + end - start
+        if self.trace is not None:
+            self.trace.append({"name": name, "ph": "X", "pid": 1, "tid": 1,
+                               "ts": (start - self.origin) / 1000, "dur": (end - start) / 1000})
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame_start = time.perf_counter_ns()
+            self.sections = {}
+            self.counters = {}
+
+    def end_frame(self, gauges=()):
+        # gauges: values sampled once per frame, like live entity counts
+        if not self.enabled or self.frame_start is None:
+            return
+        end = time.perf_counter_ns()
+        self.counter_names.update(self.counters)
+        counters = dict.fromkeys(self.counter_names, 0)
+        counters.update(self.counters)
+        counters.update(gauges)
+        self.history.append(((end - self.frame_start) / 1e6,
+                             {name: ns / 1e6 for name, ns in self.sections.items()}, counters))
+        if self.trace is not None:
+            ts = (self.frame_start - self.origin) / 1000
+            self.trace.append({"name": "frame", "ph": "X", "pid": 1, "tid": 1, "ts": ts,
+                               "dur": (end - self.frame_start) / 1000})
+            self.trace.append({"name": "counters", "ph": "C", "pid": 1, "tid": 1, "ts": ts, "args": counters})
+
+    def averages(self, frames=REFRESH_FRAMES):
+        recent = list(self.history)[-frames:]
+        if not recent:
+            return 0.0, 0.0, {}, {}
+        sections = {}
+        counters = {}
+        for _, frame_sections, frame_counters in recent:
+            for name, ms in frame_sections.items():
+                sections[name] = sections.get(name, 0) + ms
+            for name, value in frame_counters.items():
+                counters[name] = counters.get(name, 0) + value
+        n = len(recent)
+        frame_ms = [ms for ms, _, _ in recent]
+        return (sum(frame_ms) / n, max(frame_ms), {k: v / n for k, v in sections.items()},
+                {k: v / n for k, v in counters.items()})
+
+    def render_panel(self):
+        if self.font is None:
+            self.font = pygame.font.Font(None, 16)
+        avg, worst, sections, counters = self.averages()
+        # (indent, label, value) rows; dotted names are nested sections
+        left = [(0, "frame ms (avg / max)", f"{avg:.2f} / {worst:.2f}")]
+        for name in sorted(sections):
+            left.append((name.count("."), name.rsplit(".", 1)[-1], f"{sections[name]:.2f}"))
+        right = [(0, "per frame", "")] + [(0, name, f"{value:.1f}") for name, value in sorted(counters.items())]
+        height = GRAPH_HEIGHT + 8 + max(len(left), len(right)) * LINE_HEIGHT + 6
+        panel = pygame.Surface((OVERLAY_WIDTH, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 170))
+        column_width = OVERLAY_WIDTH // 2 - 12
+        for column, rows in ((6, left), (OVERLAY_WIDTH // 2 + 6, right)):
+            for i, (indent, label, value) in enumerate(rows):
+                y = GRAPH_HEIGHT + 8 + i * LINE_HEIGHT
+                panel.blit(self.font.render(label, True, (230, 230, 230)), (column + indent * 12, y))
+                text = self.font.render(value, True, (230, 230, 230))
+                panel.blit(text, (column + column_width - text.get_width(), y))
+        return panel
+
+    def draw_overlay(self, surface, x=8, y=60):
+        if self.panel is None or self.panel_age >= REFRESH_FRAMES:
+            self.panel = self.render_panel()
+            self.panel_age = 0
+        self.panel_age += 1
+        area = surface.blit(self.panel, (x, y))
+        # Rolling frame-time graph, one column per frame, with the 60 fps budget line
+        bottom = y + GRAPH_HEIGHT
+        scale = GRAPH_HEIGHT / GRAPH_MAX_MS
+        for i, (ms, _, _) in enumerate(self.history):
+            color = (80, 220, 80) if ms <= BUDGET_MS else (240, 80, 60)
+            height = min(GRAPH_HEIGHT, max(1, int(ms * scale)))
+            pygame.draw.line(surface, color, (x + 6 + i, bottom), (x + 6 + i, bottom - height))
+        budget_y = bottom - int(BUDGET_MS * scale)
+        pygame.draw.line(surface, (255, 255, 0), (x + 6, budget_y), (x + 6 + HISTORY, budget_y))
+        return area
@@ -0,0 +1,229 @@
+# Input-log replays: record a session, then play it back in real time, run it
+# headless at full speed, or seek to any tick.
+#
+#   python brickshooting.py --record session.bsr
+#   python replay.py info session.bsr
+#   python replay.py run session.bsr            # headless, as fast as possible
+#   python replay.py play session.bsr --start 3600
+#
+# A replay is the game seed and mode plus one input byte per tick (LEFT, RIGHT,
+# SPACE held, SPACE pressed, R pressed), run-length encoded. GameState is
+# deterministic for a seed and an input sequence, so that is the whole session.
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import brickshooting as game
+import snapshot
+
+MAGIC = b"BSRP"
+VERSION = 2
+HEADER = struct.Struct("<4sBBqI")  # magic, version, flags, seed, tick count
+
+# Header flags
+ENDLESS = 1
+
+# Input bits
+LEFT = 1
+RIGHT = 2
+FIRE = 4
+FIRE_PRESSED = 8
+RESTART = 16
+
+SNAPSHOT_EVERY = 300  # ticks between seek snapshots (5 s of game time)
+
+def encode_inputs(inputs):
+    return ((LEFT if inputs.left else 0) | (RIGHT if inputs.right else 0) | (FIRE if inputs.fire else 0)
+            | (FIRE_PRESSED if inputs.fire_pressed else 0) | (RESTART if inputs.restart else 0))
+
+# Every possible input byte decoded once
+DECODED = [game.Inputs(bool(b & LEFT), bool(b & RIGHT), bool(b & FIRE), bool(b & FIRE_PRESSED), bool(b & RESTART))
+           for b in range(32)]
+
+def write_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+def read_varint(data, pos):
+    n = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("replay is truncated mid-run")
+        b = data[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+class Recorder:
+    def __init__(self, seed, endless=False):
+        self.seed = seed
+        self.endless = endless
+        self.runs = []  # [input byte, run length]
+        self.ticks = 0
+
+    def record(self, inputs):
+        bits = encode_inputs(inputs)
+        if self.runs and self.runs[-1][0] == bits:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([bits, 1])
+        self.ticks += 1
+
+    def to_bytes(self):
+        out = bytearray(HEADER.pack(MAGIC, VERSION, ENDLESS if self.endless else 0, self.seed, self.ticks))
+        for bits, count in self.runs:
+            out.append(bits)
+            write_varint(out, count)
+        return bytes(out)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+class Replay:
+    def __init__(self, seed, inputs, endless=False):
+        self.seed = seed
+        self.inputs = inputs  # one input byte per tick
+        self.endless = endless
+
+    def __len__(self):
+        return len(self.inputs)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < 5 or data[:4] != MAGIC:
+            raise ValueError("not a replay file")
+        # Checked before unpacking: older versions have other headers
+        if data[4] != VERSION:
+            raise ValueError(f"unsupported replay version {data[4]}")
+        if len(data) < HEADER.size:
+            raise ValueError("replay is truncated: incomplete header")
+        _, _, flags, seed, ticks = HEADER.unpack_from(data)
+        inputs = bytearray()
+        pos = HEADER.size
+        while pos < len(data):
+            bits = data[pos]
+            if bits >= len(DECODED):
+                raise ValueError(f"bad input byte {bits} in replay")
+            count, pos = read_varint(data, pos + 1)
+            if len(inputs) + count > ticks:
+                raise ValueError(f"replay has more than its {ticks} ticks")
+            inputs += bytes([bits]) * count
+        if len(inputs) != ticks:
+            raise ValueError(f"replay is truncated: {len(inputs)} of {ticks} ticks")
+        return cls(seed, bytes(inputs), bool(flags & ENDLESS))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+class ReplayPlayer:
+    # Drives a GameState through a replay. A snapshot is kept every
+    # snapshot_every ticks, so seek() only re-simulates from the nearest one
+    def __init__(self, replay, snapshot_every=SNAPSHOT_EVERY):
+        self.replay = replay
+        self.snapshot_every = snapshot_every
+        self.state = game.GameState(seed=replay.seed, endless=replay.endless)
+        self.position = 0  # ticks applied so far
+        self.snapshots = {0: self.snapshot()}
+
+    def snapshot(self):
+        return snapshot.dump(self.state)
+
+    def restore(self, data):
+        self.state = snapshot.load(data)
+
+    @property
+    def done(self):
+        return self.position >= len(self.replay)
+
+    def step(self):
+        self.state.step(DECODED[self.replay.inputs[self.position]])
+        self.position += 1
+        if self.position % self.snapshot_every == 0 and self.position not in self.snapshots:
+            self.snapshots[self.position] = self.snapshot()
+        return self.state
+
+    def seek(self, tick):
+        tick = max(0, min(tick, len(self.replay)))
+        base = max(t for t in self.snapshots if t <= tick)
+        if not base <= self.position <= tick:
+            self.restore(self.snapshots[base])
+            self.position = base
+        while self.position < tick:
+            self.step()
+        return self.state
+
+    def run(self):
+        while not self.done:
+            self.step()
+        return self.state
+
+def describe(state):
+    return (f"tick {state.tick}, level {state.level}, score {state.score}, "
+            f"{'won' if state.win else 'game over' if state.game_over else 'in progress'}")
+
+def play(replay, start=0, speed=1.0):
+    # Real-time playback through the normal renderer and audio observers
+    game.init_display()
+    audio = game.AudioPlayer()
+    renderer = game.Renderer(game.screen, seed=replay.seed)
+    player = ReplayPlayer(replay)
+    player.seek(start)
+    accumulator = 0.0
+    running = True
+    while running:
+        for event in game.pygame.event.get():
+            if event.type == game.pygame.QUIT:
+                running = False
+        while accumulator >= game.STEP_MS and not player.done:
+            audio.play(player.step().events)
+            accumulator -= game.STEP_MS
+        renderer.draw(player.state)
+        accumulator = min(accumulator + game.clock.tick(game.FPS) * speed,
+                          game.STEP_MS * game.MAX_STEPS_PER_FRAME * max(1, speed))
+    game.pygame.quit()
+    return player.state
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, run or watch a recorded session.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    info = sub.add_parser("info", help="print the replay header")
+    info.add_argument("path")
+    run = sub.add_parser("run", help="simulate headless at full speed")
+    run.add_argument("path")
+    run.add_argument("--seek", type=int, help="stop at this tick instead of the end")
+    watch = sub.add_parser("play", help="watch the replay in real time")
+    watch.add_argument("path")
+    watch.add_argument("--start", type=int, default=0, help="tick to start watching from")
+    watch.add_argument("--speed", type=float, default=1.0, help="playback speed multiplier")
+    args = parser.parse_args(argv)
+
+    try:
+        replay = Replay.load(args.path)
+    except (OSError, ValueError) as exc:
+        sys.exit(f"{args.path}: {exc}")
+    if args.command == "info":
+        print(f"seed {replay.seed}{', endless' if replay.endless else ''}, {len(replay)} ticks ({len(replay) / game.FPS:.1f} s), "
+              f"{os.path.getsize(args.path)} bytes")
+    elif args.command == "run":
+        player = ReplayPlayer(replay)
+        start = time.perf_counter()
+        state = player.seek(args.seek) if args.seek is not None else player.run()
+        elapsed = time.perf_counter() - start
+        print(describe(state))
+        print(f"{player.position} ticks in {elapsed:.3f} s ({player.position / max(elapsed, 1e-9):.0f} ticks/s)")
+    else:
+        print(describe(play(replay, args.start, args.speed)))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+# Whole-game snapshots as one flat, compact buffer: fixed structs for the
+# scalars, the character, the boss and the rng, then the raw entity arrays.
+# dump() and load() take tens of microseconds, so replays keep a snapshot
+# every few seconds for seeking, and the kiosk saves the running game often
+# enough to resume it after a power cut:
+#
+#   python brickshooting.py --autosave kiosk.bss
+#
+# For many cheap copies in one process, GameState.clone() is faster still; it
+# shares the brick field copy-on-write instead of serializing it.
+
+import logging
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import brickshooting as game
+
+MAGIC = b"BSSN"
+VERSION = 1
+HEADER = struct.Struct("<4sBI")  # magic, version, crc32 of the rest
+
+# Game flags
+GAME_OVER = 1
+WIN = 2
+ENDLESS = 4
+BOSS = 8
+SEEDED = 16
+
+STATE = struct.Struct("<BqqHq")  # flags, seed, tick, level, score
+COUNTS = struct.Struct("<IIIII")  # bricks, powerups, shots, fireballs, sparks
+# rect, speed, last direction, shoot timer, firing multiplier, animation frame
+CHARACTER = struct.Struct("<iiiiibqid")
+BOSS_STATE = struct.Struct("<iiiiiiii")  # rect, hp, max hp, dir, phase
+RNG = struct.Struct("<d625I")  # gauss_next (NaN for none), Mersenne Twister state
+ROWS = struct.Struct("<qH")  # endless rows streamed, columns
+
+def pack_rng(rng):
+    version, words, gauss = rng.getstate()
+    return RNG.pack(float("nan") if gauss is None else gauss, *words)
+
+def unpack_rng(rng, data, pos):
+    values = RNG.unpack_from(data, pos)
+    gauss = None if values[0] != values[0] else values[0]
+    rng.setstate((3, values[1:], gauss))
+    return pos + RNG.size
+
+def dump(state):
+    flags = ((GAME_OVER if state.game_over else 0) | (WIN if state.win else 0) | (ENDLESS if state.endless else 0)
+             | (BOSS if state.boss else 0) | (SEEDED if state.seed is not None else 0))
+    pools = (state.projectiles, state.boss_projectiles, state.sparks)
+    parts = [STATE.pack(flags, state.seed or 0, state.tick, state.level, state.score),
+             COUNTS.pack(len(state.bricks), len(state.powerups), *(pool.count for pool in pools))]
+    char = state.character
+    parts.append(CHARACTER.pack(*char.rect, char.speed, char.last_direction, char.shoot_timer,
+                                char.firing_multiplier, char.animation_frame))
+    if state.boss:
+        boss = state.boss
+        parts.append(BOSS_STATE.pack(*boss.rect, boss.hp, boss.max_hp, boss.dir, boss.phase))
+    parts.append(pack_rng(state.rng))
+    if state.endless:
+        parts.append(ROWS.pack(state.rows.count, state.rows.cols))
+        parts.append(pack_rng(state.rows.rng))
+    # Bricks in drawing order: x, y, w, h, hp
+    parts.append(np.array([(*brick.rect, brick.hp) for brick in state.bricks], dtype=np.int32).tobytes())
+    parts.append(np.array([(*p.rect, game.POWERUP_TYPES.index(p.type)) for p in state.powerups],
+                          dtype=np.int32).tobytes())
+    parts.append(np.array([(p.dx, p.dy) for p in state.powerups], dtype=np.float64).tobytes())
+    for pool in pools:
+        for name in pool.arrays:
+            parts.append(getattr(pool, name)[:pool.count].tobytes())
+    body = b"".join(parts)
+    return HEADER.pack(MAGIC, VERSION, zlib.crc32(body)) + body
+
+def load(data):
+    magic, version, crc = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a snapshot")
+    if version != VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    body = memoryview(data)[HEADER.size:]
+    if zlib.crc32(body) != crc:
+        raise ValueError("snapshot is corrupt")
+    pos = 0
+
+    def take(layout):
+        nonlocal pos
+        values = layout.unpack_from(body, pos)
+        pos += layout.size
+        return values
+
+    def take_array(dtype, count):
+        nonlocal pos
+        arr = np.frombuffer(body, dtype=dtype, count=count, offset=pos)
+        pos += arr.nbytes
+        return arr
+
+    flags, seed, tick, level, score = take(STATE)
+    n_bricks, n_powerups, *counts = take(COUNTS)
+    state = object.__new__(game.GameState)
+    state.seed = seed if flags & SEEDED else None
+    state.tick = tick
+    state.level = level
+    state.score = score
+    state.game_over = bool(flags & GAME_OVER)
+    state.win = bool(flags & WIN)
+    state.endless = bool(flags & ENDLESS)
+    state.events = []
+
+    x, y, w, h, speed, last_direction, shoot_timer, firing_multiplier, animation_frame = take(CHARACTER)
+    char = object.__new__(game.Character)
+    char.rect = game.pygame.Rect(x, y, w, h)
+    char.speed = speed
+    char.last_direction = last_direction
+    char.shoot_timer = shoot_timer
+    char.firing_multiplier = firing_multiplier
+    char.animation_frame = animation_frame
+    state.character = char
+
+    state.boss = None
+    if flags & BOSS:
+        x, y, w, h, hp, max_hp, direction, phase = take(BOSS_STATE)
+        boss = game.Boss(game.pygame.Rect(x, y, w, h), max_hp)
+        boss.hp = hp
+        boss.dir = direction
+        boss.phase = phase
+        state.boss = boss
+    state.rng = game.random.Random()
+    pos = unpack_rng(state.rng, body, pos)
+    if state.endless:
+        count, cols = take(ROWS)
+        state.rows = game.EndlessRows(0, cols)
+        state.rows.count = count
+        pos = unpack_rng(state.rows.rng, body, pos)
+
+    state.bricks = game.BrickField(game.Brick(game.pygame.Rect(x, y, w, h), hp) for x, y, w, h, hp
+                                   in take_array(np.int32, n_bricks * 5).reshape(-1, 5).tolist())
+    rects = take_array(np.int32, n_powerups * 5).reshape(-1, 5).tolist()
+    drift = take_array(np.float64, n_powerups * 2).reshape(-1, 2).tolist()
+    state.powerups = [game.Powerup(game.pygame.Rect(x, y, w, h), game.POWERUP_TYPES[t], dx, dy)
+                      for (x, y, w, h, t), (dx, dy) in zip(rects, drift)]
+
+    pools = []
+    for cls, count in zip((game.ProjectileStore, game.FireballStore, game.SparkPool), counts):
+        pool = cls()
+        if count > len(getattr(pool, pool.arrays[0])):
+            pool = cls(count)
+        for name in pool.arrays:
+            arr = getattr(pool, name)
+            arr[:count] = take_array(arr.dtype, count)
+        pool.count = count
+        pools.append(pool)
+    state.projectiles, state.boss_projectiles, state.sparks = pools
+    return state
+
+log = logging.getLogger("autosave")
+
+def write(path, data):
+    # Atomic: the file on disk is always a whole snapshot, the old one or the
+    # new one, even if the power goes mid-write
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return  # directories cannot be opened on some platforms
+    try:
+        os.fsync(fd)  # makes the rename itself durable
+    finally:
+        os.close(fd)
+
+def save(path, state):
+    write(path, dump(state))
+
+class Autosaver:
+    # Periodic saves for the main loop, which must never wait on the disk:
+    # the snapshot is dumped on the caller's thread and written, synced and
+    # renamed on a writer thread. A save due while the last one is still
+    # writing is skipped; the next one catches up
+    def __init__(self, path):
+        self.path = path
+        self.pool = ThreadPoolExecutor(1, thread_name_prefix="autosave")
+        self.future = None
+
+    def finished(self):
+        # True when no write is in flight; logs a failed one
+        if self.future is None:
+            return True
+        if not self.future.done():
+            return False
+        if self.future.exception():
+            log.warning("saving %s failed: %s", self.path, self.future.exception())
+        self.future = None
+        return True
+
+    def save(self, state):
+        if self.finished():
+            self.future = self.pool.submit(write, self.path, dump(state))
+
+    def close(self, state):
+        # The final save blocks: the game is exiting, and it has to land
+        if self.future is not None:
+            self.future.exception()  # waits for it
+        self.finished()
+        self.pool.shutdown()
+        save(self.path, state)
+
+def resume(path):
+    # The saved game, or None when there is none or it cannot be read
+    try:
+        with open(path, "rb") as f:
+            return load(f.read())
+    except (OSError, ValueError, struct.error):
+        return None
@@ -0,0 +1,90 @@
+import copy
+import json
+import os
+
+import numpy as np
+import pytest
+
+import brickshooting as game
+import levels
+from levels import EndlessRows, compile_level, load_level, load_levels, pack, unpack
+
+SOURCE = {"name": "Test Level é", "hitbox": [22, 42], "projectile_speed": 14, "powerup_chance": 0.1,
+          "layout": ["9.2", "..1", "3"]}
+
+def assert_same(a, b):
+    assert (a.name, a.boss, a.tuning) == (b.name, b.boss, b.tuning)
+    assert a.grid.dtype == b.grid.dtype == np.uint8
+    assert np.array_equal(a.grid, b.grid)
+
+def test_compile():
+    level = compile_level(SOURCE, 4)
+    assert level.name == SOURCE["name"] and not level.boss
+    assert level.tuning == {"hitbox": (22, 42), "projectile_speed": 14, "powerup_chance": 0.1}
+    assert level.grid.tolist() == [[9, 0, 2, 0], [0, 0, 1, 0], [3, 0, 0, 0]]
+
+@pytest.mark.parametrize("source", [SOURCE, dict(SOURCE, layout=[], boss=True)])
+def test_pack_unpack_round_trip(source):
+    level = compile_level(source, 4)
+    assert_same(unpack(pack(level)), level)
+
+def test_unpack_rejects_other_data():
+    data = pack(compile_level(SOURCE, 4))
+    with pytest.raises(ValueError):
+        unpack(b"XXXX" + data[4:])
+
+@pytest.mark.parametrize("change, message", [
+    ({"layout": ["12x"]}, "bad brick"),
+    ({"layout": ["11111"]}, "wider"),
+    ({"layout": []}, "needs a layout"),
+    ({"boss": True}, "no layout"),
+])
+def test_compile_errors(change, message):
+    with pytest.raises(ValueError, match=message):
+        compile_level(dict(SOURCE, **change), 4)
+
+def write(path, source):
+    with open(path, "w") as f:
+        json.dump(source, f)
+
+def test_cache(tmp_path, monkeypatch):
+    path = str(tmp_path / "level01.json")
+    cache = str(tmp_path / "cache")
+    write(path, SOURCE)
+    first = load_level(path, 4, cache)
+    assert len(os.listdir(cache)) == 1
+    # An unchanged file is read from the cache without being compiled
+    monkeypatch.setattr(levels, "compile_level", lambda *args: pytest.fail("compiled a cached level"))
+    assert_same(load_level(path, 4, cache), first)
+    monkeypatch.undo()
+    # An edited file is compiled again under a new key
+    write(path, dict(SOURCE, layout=["1111"]))
+    edited = load_level(path, 4, cache)
+    assert edited.grid.tolist() == [[1, 1, 1, 1]]
+    assert len(os.listdir(cache)) == 2
+    # A different column count is a different record
+    assert load_level(path, 5, cache).grid.shape == (1, 5)
+    # A corrupt record is recompiled and rewritten
+    for name in os.listdir(cache):
+        with open(os.path.join(cache, name), "wb") as f:
+            f.write(b"BSLV\x00")
+    assert_same(load_level(path, 4, cache), edited)
+    assert_same(load_level(path, 4, cache), edited)
+
+def test_shipped_levels(tmp_path):
+    shipped = load_levels(game.level_dir, game.BRICK_COLS)
+    assert [level.boss for level in shipped] == [False] * (len(shipped) - 1) + [True]
+    cached = load_levels(game.level_dir, game.BRICK_COLS, str(tmp_path))
+    for a, b in zip(shipped, cached):
+        assert_same(a, b)
+    with pytest.raises(ValueError):
+        load_levels(str(tmp_path), game.BRICK_COLS)
+
+def test_endless_rows_are_seeded_and_copyable():
+    rows = EndlessRows(5, game.BRICK_COLS)
+    first = [next(rows) for _ in range(50)]
+    fork = copy.deepcopy(rows)
+    assert [next(rows) for _ in range(50)] == [next(fork) for _ in range(50)]
+    again = EndlessRows(5, game.BRICK_COLS)
+    assert [next(again) for _ in range(50)] == first
+    assert all(len(row) == game.BRICK_COLS and all(0 <= hp <= 4 for hp in row) for row in first)
@@ -0,0 +1,24 @@
+import pygame
+import pytest
+
+import brickshooting as game
+from conftest import scripted
+
+@pytest.fixture(scope="module")
+def display():
+    if game.screen is None:
+        game.init_display(background=False)
+
+@pytest.mark.parametrize("endless, ticks", [(False, 300), (True, 400)])
+def test_dirty_rects_match_full_repaint(display, endless, ticks):
+    # Two copies of one game, drawn each way; every frame must match
+    full, dirty = (pygame.Surface((game.WIDTH, game.HEIGHT)).convert() for _ in range(2))
+    full_renderer = game.Renderer(full, seed=5, present=False)
+    dirty_renderer = game.Renderer(dirty, dirty_rects=True, seed=5)
+    a, b = game.GameState(seed=11, endless=endless), game.GameState(seed=11, endless=endless)
+    for tick in range(ticks):
+        a.step(scripted(tick))
+        b.step(scripted(tick))
+        full_renderer.draw(a)
+        dirty_renderer.draw(b)
+        assert pygame.image.tobytes(full, "RGB") == pygame.image.tobytes(dirty, "RGB"), f"tick {tick}"
@@ -0,0 +1,73 @@
+import pytest
+
+import brickshooting as game
+import snapshot
+from replay import (DECODED, HEADER, MAGIC, VERSION, Recorder, Replay, ReplayPlayer, encode_inputs,
+                    read_varint, write_varint)
+
+from conftest import scripted
+
+@pytest.mark.parametrize("n", [0, 1, 127, 128, 300, 16383, 16384, 2 ** 32, 2 ** 63])
+def test_varint_round_trip(n):
+    out = bytearray(b"x")
+    write_varint(out, n)
+    assert read_varint(bytes(out), 1) == (n, len(out))
+
+def test_varint_truncated():
+    out = bytearray()
+    write_varint(out, 300)
+    with pytest.raises(ValueError):
+        read_varint(bytes(out[:-1]), 0)
+
+def test_inputs_encode_and_decode():
+    for bits, inputs in enumerate(DECODED):
+        assert encode_inputs(inputs) == bits
+
+def record(ticks, seed=7, endless=False):
+    recorder = Recorder(seed, endless)
+    for tick in range(ticks):
+        recorder.record(scripted(tick))
+    return recorder
+
+def test_run_length_round_trip():
+    recorder = record(2000, endless=True)
+    data = recorder.to_bytes()
+    replay = Replay.from_bytes(data)
+    assert (replay.seed, replay.endless, len(replay)) == (7, True, 2000)
+    assert replay.inputs == bytes(encode_inputs(scripted(tick)) for tick in range(2000))
+    # Held inputs collapse into runs
+    assert len(data) < HEADER.size + 2000 // 4
+
+def test_rejects_malformed():
+    data = record(500).to_bytes()
+    bad = [
+        b"",
+        b"XXXX" + data[4:],
+        data[:4] + bytes([VERSION - 1]) + data[5:],
+        data[:HEADER.size - 1],          # short header
+        data[:-1],                       # run cut off mid-varint
+        data[:HEADER.size] + bytes([1]),  # run without its count
+        data[:HEADER.size] + bytes([200, 1]) + data[HEADER.size:],  # unknown input bits
+        data + bytes([0, 5]),            # more ticks than the header says
+        data[:HEADER.size] + data[HEADER.size + 2:],  # fewer
+    ]
+    for case in bad:
+        with pytest.raises(ValueError):
+            Replay.from_bytes(case)
+    assert data[:4] == MAGIC
+
+def test_record_run_seek_is_deterministic():
+    ticks = 1500
+    state = game.GameState(seed=7)
+    expected = {}
+    for tick in range(ticks):
+        state.step(scripted(tick))
+        if state.tick in (299, 700, ticks):
+            expected[state.tick] = snapshot.dump(state)
+    replay = Replay.from_bytes(record(ticks).to_bytes())
+    player = ReplayPlayer(replay, snapshot_every=300)
+    assert snapshot.dump(player.run()) == expected[ticks]
+    # Backwards from the end, then forwards again from a kept snapshot
+    assert snapshot.dump(player.seek(700)) == expected[700]
+    assert snapshot.dump(player.seek(299)) == expected[299]
+    assert snapshot.dump(player.seek(ticks)) == expected[ticks]
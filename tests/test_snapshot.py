@@ -0,0 +1,97 @@
+import struct
+import zlib
+
+import pytest
+
+import brickshooting as game
+import snapshot
+
+def staged(level=1, seed=11, endless=False):
+    state = game.GameState(seed=seed, endless=endless)
+    while state.level < level:
+        state.advance_level()
+    return state
+
+@pytest.mark.parametrize("level, endless", [(1, False), (4, False), (5, False), (1, True)])
+def test_load_then_step_matches_uninterrupted_run(play, level, endless):
+    state = play(staged(level, endless=endless), 400)
+    resumed = snapshot.load(snapshot.dump(state))
+    assert snapshot.dump(resumed) == snapshot.dump(state)
+    play(state, 600)
+    play(resumed, 600)
+    assert snapshot.dump(resumed) == snapshot.dump(state)
+    assert (resumed.score, resumed.level, resumed.game_over) == (state.score, state.level, state.game_over)
+
+def test_load_unseeded_and_game_over(play):
+    state = play(game.GameState(), 100)
+    state.game_over = True
+    resumed = snapshot.load(snapshot.dump(state))
+    assert resumed.seed is None and resumed.game_over
+
+def test_rejects_corrupt_snapshots(play):
+    data = snapshot.dump(play(staged(4), 200))
+    flipped = bytearray(data)
+    flipped[-1] ^= 1
+    with pytest.raises(ValueError, match="corrupt"):
+        snapshot.load(bytes(flipped))
+    body = data[snapshot.HEADER.size:]
+    with pytest.raises(ValueError, match="version"):
+        snapshot.load(snapshot.HEADER.pack(snapshot.MAGIC, snapshot.VERSION + 1, zlib.crc32(body)) + body)
+    with pytest.raises(ValueError, match="not a snapshot"):
+        snapshot.load(b"XXXX" + data[4:])
+
+def test_save_and_resume(tmp_path, play):
+    path = str(tmp_path / "kiosk.bss")
+    assert snapshot.resume(path) is None
+    state = play(staged(2), 300)
+    snapshot.save(path, state)
+    assert snapshot.dump(snapshot.resume(path)) == snapshot.dump(state)
+    with open(path, "r+b") as f:
+        f.truncate(40)
+    assert snapshot.resume(path) is None
+
+def test_autosaver_writes_in_the_background(tmp_path, play):
+    path = str(tmp_path / "kiosk.bss")
+    state = play(staged(), 100)
+    saver = snapshot.Autosaver(path)
+    saver.save(state)
+    play(state, 100)
+    saver.close(state)
+    assert snapshot.dump(snapshot.resume(path)) == snapshot.dump(state)
+
+def test_clone_is_independent(play):
+    state = play(staged(3), 200)
+    before = snapshot.dump(state)
+    twin = snapshot.load(before)
+    clone = state.clone()
+    assert clone.bricks.shared
+    # Stepping the clone, which breaks bricks, leaves the original untouched
+    play(clone, 400)
+    assert clone.score > state.score
+    assert snapshot.dump(state) == before
+    # and the original then plays out exactly as an unshared copy does
+    play(state, 400)
+    play(twin, 400)
+    assert snapshot.dump(state) == snapshot.dump(twin)
+    assert snapshot.dump(state) == snapshot.dump(clone)
+
+def first(field):
+    return next(iter(field))
+
+def test_clone_bricks_copy_on_write():
+    state = staged(2)
+    clone = state.clone()
+    shared = first(clone.bricks)
+    hp = shared.hp
+    assert first(state.bricks) is shared
+    # Each side copies the bricks before its first change (own() comes
+    # before the lookup, as share() requires of callers)
+    clone.bricks.own()
+    assert first(clone.bricks) is not shared
+    clone.bricks.damage(first(clone.bricks))
+    assert (shared.hp, first(clone.bricks).hp) == (hp, hp - 1)
+    state.bricks.own()
+    state.bricks.damage(first(state.bricks))
+    state.bricks.remove(first(state.bricks))
+    assert (shared.hp, first(clone.bricks).hp) == (hp, hp - 1)
+    assert len(clone.bricks) == len(state.bricks) + 1
@@ -0,0 +1,66 @@
+# Sound-effect voices. Each effect plays on its own small pool of reserved
+# mixer channels, so rapid fire can never take every channel:
+#   - a trigger within `window` ms of the effect's last start merges into that
+#     voice and raises its volume instead of starting another play, which also
+#     caps starts at one per window per effect
+#   - otherwise a free channel of the pool starts the sound, or the pool's
+#     oldest voice is stopped and reused
+
+from collections import namedtuple
+
+import pygame
+
+# channels: reserved channels; window: merge window in ms; volume: volume of a
+# single trigger; boost: volume added per merged trigger, up to 1.0
+Voice = namedtuple("Voice", ["channels", "window", "volume", "boost"], defaults=[1.0, 0.0])
+
+FREE_CHANNELS = 4  # left unreserved for sounds without a voice
+
+class VoicePool:
+    def __init__(self, voice, first_channel):
+        self.voice = voice
+        self.channels = [pygame.mixer.Channel(first_channel + i) for i in range(voice.channels)]
+        self.started = [None] * voice.channels  # start time per channel
+        self.last = None  # channel of the latest start
+        self.merged = 0   # triggers merged into it
+
+    def trigger(self, sound, now):
+        # Returns what happened: "merge", "start" or "steal"
+        voice = self.voice
+        if self.last is not None and now - self.started[self.last] < voice.window:
+            self.merged += 1
+            self.channels[self.last].set_volume(min(1.0, voice.volume + voice.boost * self.merged))
+            return "merge"
+        result = "start"
+        free = [i for i, channel in enumerate(self.channels) if not channel.get_busy()]
+        if free:
+            i = free[0]
+        else:
+            i = min(range(len(self.channels)), key=lambda c: self.started[c])
+            result = "steal"
+        channel = self.channels[i]
+        channel.play(sound)
+        channel.set_volume(voice.volume)
+        self.started[i] = now
+        self.last = i
+        self.merged = 0
+        return result
+
+class VoiceManager:
+    def __init__(self, voices):
+        # voices: sound name -> Voice
+        reserved = sum(voice.channels for voice in voices.values())
+        pygame.mixer.set_num_channels(max(pygame.mixer.get_num_channels(), reserved + FREE_CHANNELS))
+        pygame.mixer.set_reserved(reserved)
+        self.pools = {}
+        first = 0
+        for name, voice in voices.items():
+            self.pools[name] = VoicePool(voice, first)
+            first += voice.channels
+
+    def play(self, name, sound, now=None):
+        pool = self.pools.get(name)
+        if pool is None:
+            sound.play()
+            return "start"
+        return pool.trigger(sound, pygame.time.get_ticks() if now is None else now)